@@ -0,0 +1,112 @@
+"""
+Review many merge requests and pull requests in one process.
+
+URLs come from the command line, or from stdin (one per line) when none are given or the only argument is '-':
+
+    python batch_analyzer.py https://gitlab.com/group/project/-/merge_requests/1 https://github.com/org/repo/pull/2
+    cat open_mrs.txt | python batch_analyzer.py
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Dict, List, Optional, TextIO, Tuple
+from rich.table import Table
+from rich import box
+from gitlab_mr_analyzer import MergeRequestReview, console_stream, create_review_context, create_vcs, error_message, finish_run, publish_result, render_review, save_review_state, start_review
+from output.rich_output import console_for
+from review_pipeline import ReviewContext
+from vcs.version_control import VersionControl
+
+
+class ClientPool:
+    """
+    One VCS client per backend and domain, shared by every merge request so their HTTP sessions are reused.
+    """
+    def __init__(self):
+        self.clients: Dict[Tuple[str, str], object] = {}
+        self.lock = threading.Lock()
+
+    def client(self, vcs: VersionControl, token: Optional[str]):
+        key = (type(vcs).__name__, vcs.domain())
+        with self.lock:
+            if key not in self.clients:
+                self.clients[key] = vcs.client(key[1], token)
+            return self.clients[key]
+
+
+def read_urls(args: List[str]) -> List[str]:
+    """
+    Return the URLs given as arguments, or read them from stdin, skipping blank lines and # comments.
+    """
+    lines = args if args and args != ['-'] else sys.stdin.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
+def review_merge_request(context: ReviewContext, pool: ClientPool, mr_url: str) -> MergeRequestReview:
+    """
+    Submit every file review of a merge request and wait for them, so rendering the result never blocks.
+    Failed file reviews are reported when the merge request is rendered.
+    """
+    vcs, token = create_vcs(mr_url)
+    review = start_review(context, vcs, pool.client(vcs, token), mr_url)
+    wait(set(review.reviews.values()))
+    return review
+
+
+def print_batch_summary(results: List[Tuple[str, str, Optional[float], Optional[int]]], stream: TextIO = sys.stdout) -> None:
+    my_table = Table(title="Batch Summary", show_lines=True, box=box.MINIMAL_DOUBLE_HEAD)
+    my_table.add_column("Merge Request", style="white", no_wrap=False)
+    my_table.add_column("Status", justify="left", style="cyan", no_wrap=False)
+    my_table.add_column("Final Score", justify="right", style="green", no_wrap=True)
+    my_table.add_column("MUST Findings", justify="right", style="red", no_wrap=True)
+    for mr_url, status, final_score, must_count in results:
+        my_table.add_row(mr_url, status, "" if final_score is None else f"{final_score:.1f}/10", "" if must_count is None else str(must_count))
+    console_for(stream).print(my_table)
+
+
+def main() -> None:
+    mr_urls = read_urls(sys.argv[1:])
+    if len(mr_urls) == 0:
+        print("Usage: python batch_analyzer.py <MR_or_PR_URL>... (or URLs on stdin, one per line)")
+        sys.exit(1)
+
+    context = None
+    results = []
+    # errors and the batch summary go to stderr when a machine-readable output owns stdout
+    stream = console_stream()
+    try:
+        context = create_review_context()
+        pool = ClientPool()
+        with ThreadPoolExecutor(max_workers=int(os.environ.get('REVIEW_MR_CONCURRENCY', '4')), thread_name_prefix='merge-request') as executor:
+            futures = {executor.submit(review_merge_request, context, pool, mr_url): mr_url for mr_url in mr_urls}
+            # merge requests are printed as they finish; one failing does not stop the others
+            for future in as_completed(futures):
+                mr_url = futures[future]
+                try:
+                    review = future.result()
+                    result = render_review(context, review)
+                    save_review_state(context, review)
+                    publish_result(context, review, result)
+                    status = f"Error: {result.failed} file reviews failed" if result.failed else "ok"
+                    results.append((mr_url, status, result.final_score, result.must_count))
+                except Exception as e:
+                    print(f"{mr_url}: {error_message(e)}", file=stream)
+                    results.append((mr_url, error_message(e), None, None))
+                print(file=stream)
+
+        print_batch_summary(results, stream)
+        finish_run(context)
+    except Exception as e:
+        print(error_message(e), file=stream)
+        sys.exit(1)
+    finally:
+        if context:
+            context.close()
+
+    if any(status != "ok" for _, status, _, _ in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark the merge request analyzer end to end and per stage against synthetic merge requests.
+
+Runs with a synthetic VCS and the offline stub LLM backend, so it needs no network or tokens:
+
+    python -m benchmarks.bench_analyzer --sizes 10 100 1000 --output bench_output.json
+    python -m benchmarks.bench_analyzer --baseline previous.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import wait
+from typing import Dict, List
+
+from benchmarks.synthetic_vcs import SyntheticVCS
+from findings_store import FindingsStore
+from gitlab_mr_analyzer import publish_result, render_review, save_review_state, start_review
+from instrumentation import Tracer
+from llm.stub import StubBackend
+from output.plain_output import PlainOutput
+from output.rich_output import RichOutput
+from review_dedup import ReviewDeduplicator
+from review_engine import ReviewEngine
+from review_pipeline import ReviewContext
+from review_router import ReviewRouter
+from review_state import ReviewState
+from standards_registry import StandardsRegistry
+from test_classifier import ClassifierStats
+
+STAGES = ['change_fetching', 'classification', 'standards_loading', 'planning', 'llm_calls', 'rendering', 'publishing', 'incremental_rerun']
+
+
+@contextlib.contextmanager
+def stage(timings: Dict[str, float], name: str):
+    started = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - started
+
+
+def run_benchmark(file_count: int, llm_latency: float, concurrency: int, renderer: str = 'rich') -> Dict:
+    """
+    Analyze one synthetic merge request of file_count files through the analyzer's own start_review, render_review and
+    publish_result, with deduplication, routing, incremental state and the findings store configured as in a run, and
+    return per-stage latency, throughput and peak memory. The merge request is then reviewed again unchanged, which
+    the incremental state answers without LLM calls.
+    """
+    timings: Dict[str, float] = {}
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    vcs = SyntheticVCS(file_count)
+    engine = ReviewEngine(max_workers=concurrency, requests_per_minute=10 ** 9)
+    output = RichOutput() if renderer == 'rich' else PlainOutput()
+    with tempfile.TemporaryDirectory() as state_dir, contextlib.redirect_stdout(io.StringIO()):
+        context = ReviewContext(StubBackend(latency=llm_latency), engine, None, ClassifierStats(), Tracer(), StandardsRegistry(),
+                                ReviewState(os.path.join(state_dir, 'state.sqlite3')), output, True,
+                                ReviewDeduplicator.from_env(), ReviewRouter.from_env(), FindingsStore())
+        try:
+            with stage(timings, 'planning'):
+                review = start_review(context, vcs, vcs.client(vcs.domain(), ''), vcs.change_id())
+            with stage(timings, 'llm_calls'):
+                wait(set(review.reviews.values()))
+            with stage(timings, 'rendering'):
+                result = render_review(context, review)
+            with stage(timings, 'publishing'):
+                save_review_state(context, review)
+                publish_result(context, review, result)
+            with stage(timings, 'incremental_rerun'):
+                rerun = start_review(context, vcs, vcs.client(vcs.domain(), ''), vcs.change_id())
+                wait(set(rerun.reviews.values()))
+                render_review(context, rerun)
+        finally:
+            context.close()
+
+    # fetching, classification and standards loading happen inside start_review and are taken from its spans
+    spans = context.tracer.stage_totals()
+    for name, span in [('change_fetching', 'vcs_fetch'), ('classification', 'classification'), ('standards_loading', 'standards_loading')]:
+        timings[name] = spans.get(span, {}).get('total', 0.0)
+    timings['planning'] = max(0.0, timings['planning'] - timings['change_fetching'] - timings['classification'] - timings['standards_loading'])
+
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'files': file_count,
+        'reviewed_files': len(review.reviews),
+        'llm_calls': context.tracer.counters.get('llm_calls', 0),
+        'failed_files': result.failed,
+        'stages': timings,
+        'total_seconds': total,
+        'files_per_second': file_count / total if total else 0.0,
+        'peak_memory_bytes': peak,
+    }
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_comparison(runs: List[Dict], baseline: Dict) -> None:
+    """
+    Print each stage's latency relative to a previous results file; ratios above 1.0 are slower.
+    """
+    previous = {run['files']: run for run in baseline['runs']}
+    for run in runs:
+        if run['files'] not in previous:
+            continue
+        before = previous[run['files']]
+        ratios = [f"{name}={run['stages'][name] / before['stages'][name]:.2f}x" for name in STAGES if before['stages'].get(name)]
+        print(f"{run['files']} files vs {baseline['commit'][:10]}: total={run['total_seconds'] / before['total_seconds']:.2f}x " + ' '.join(ratios))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000], help="synthetic merge request sizes in files")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="simulated seconds per stub LLM call")
+    parser.add_argument('--concurrency', type=int, default=8, help="review engine worker count")
+    parser.add_argument('--renderer', choices=['rich', 'plain'], default='rich', help="output the rendering stage writes reviews with")
+    parser.add_argument('--output', default='bench_output.json', help="where to write the JSON results")
+    parser.add_argument('--baseline', help="a previous results file to compare against")
+    args = parser.parse_args()
+
+    runs = []
+    for size in args.sizes:
+        run = run_benchmark(size, args.llm_latency, args.concurrency, args.renderer)
+        runs.append(run)
+        stages = ' '.join(f"{name}={run['stages'][name] * 1000:.1f}ms" for name in STAGES)
+        print(f"{size} files: {run['total_seconds']:.3f}s, {run['files_per_second']:.0f} files/s, {run['llm_calls']} LLM calls, peak {run['peak_memory_bytes'] / 1024 / 1024:.1f} MiB | {stages}")
+
+    results = {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'llm_latency': args.llm_latency,
+        'concurrency': args.concurrency,
+        'renderer': args.renderer,
+        'runs': runs,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            print_comparison(runs, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
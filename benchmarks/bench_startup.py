@@ -0,0 +1,61 @@
+"""
+Check that importing the analyzer CLI stays within its startup budget and loads no optional heavy dependency.
+
+Each run imports gitlab_mr_analyzer in a fresh interpreter, so the measurement includes every module it pulls in:
+
+    python -m benchmarks.bench_startup --budget-ms 500
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+# modules only a run that selects them may load: VCS backends, the ell LLM provider and rich rendering
+LAZY_MODULES = ['gitlab', 'github', 'ell', 'openai', 'rich']
+
+IMPORT_TIME_LINE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| (\S+)')
+
+PROBE = f"import sys, json, gitlab_mr_analyzer; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+
+
+def measure_import() -> Dict:
+    """
+    Import the CLI module in a fresh interpreter and return its cumulative import time and the lazy modules it loaded.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], cwd=root, capture_output=True, text=True, check=True)
+    import_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match and match.group(2) == 'gitlab_mr_analyzer':
+            import_us = int(match.group(1))
+    return {'import_ms': import_us / 1000, 'loaded': json.loads(result.stdout)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=500.0, help="largest allowed median import time of gitlab_mr_analyzer")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters to measure")
+    args = parser.parse_args()
+
+    measurements = [measure_import() for _ in range(args.runs)]
+    median_ms = statistics.median(measurement['import_ms'] for measurement in measurements)
+    loaded: List[str] = sorted({module for measurement in measurements for module in measurement['loaded']})
+    print(f"gitlab_mr_analyzer import: {median_ms:.1f} ms median over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"import time {median_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if loaded:
+        failures.append(f"modules that should load lazily were imported: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import random
+from typing import List
+from models.change import Change
+from models.review_comment import ReviewComment
+from vcs.change_set import ChangeSet, count_diff_lines
+from vcs.version_control import VersionControl
+
+# (file name template, weight) covering languages with and without coding standards, docs and configuration
+FILE_KINDS = [
+    ('services/svc{index}/handler.go', 30),
+    ('services/svc{index}/handler_test.go', 10),
+    ('src/Project{index}/Controller.cs', 15),
+    ('deploy/app{index}.dockerfile', 5),
+    ('tools/script{index}.py', 15),
+    ('web/component{index}.ts', 10),
+    ('docs/page{index}.md', 10),
+    ('config/settings{index}.yaml', 5),
+]
+
+CODE_LINES = [
+    'if err != nil {{ return err }}',
+    'result := compute(value{n})',
+    'for i := 0; i < {n}; i++ {{ total += i }}',
+    'var item{n} = items[{n}]',
+    'log.Printf("processing %d", {n})',
+]
+
+
+class SyntheticVCS(VersionControl):
+    """
+    Generates a deterministic synthetic merge request with a mix of languages and diff sizes for benchmarks.
+    """
+    def __init__(self, file_count: int, seed: int = 0):
+        self.file_count = file_count
+        self.seed = seed
+
+    def domain(self) -> str:
+        return 'synthetic'
+
+    def project_path(self) -> str:
+        return 'synthetic/project'
+
+    def change_id(self) -> str:
+        return str(self.file_count)
+
+    def client(self, url: str, token: str):
+        return None
+
+    def checkout_changes(self, vcs_client, project_path: str, mr_iid: str) -> ChangeSet:
+        generator = random.Random(self.seed)
+        templates = [template for template, _ in FILE_KINDS]
+        weights = [weight for _, weight in FILE_KINDS]
+        changes: List[Change] = []
+        for index in range(self.file_count):
+            path = generator.choices(templates, weights)[0].format(index=index)
+            diff = synthetic_diff(generator, generator.choice([3, 10, 40, 200]))
+            additions, deletions = count_diff_lines(diff)
+            changes.append(Change(new_path=path, old_path=path, diff=diff, status='modified', additions=additions, deletions=deletions))
+        return ChangeSet(changes)
+
+    def head_sha(self, vcs_client, project_path: str, mr_iid: str) -> str:
+        return f'synthetic-{self.seed}'
+
+    def posted_comments(self, vcs_client, project_path: str, mr_iid: str) -> List[str]:
+        return []
+
+    def post_review(self, vcs_client, project_path: str, mr_iid: str, comments: List[ReviewComment], body: str) -> None:
+        pass
+
+
+def synthetic_diff(generator: random.Random, line_count: int) -> str:
+    """
+    Build a unified diff of roughly line_count lines split into hunks of up to 20 lines.
+    """
+    hunks = []
+    for start in range(0, line_count, 20):
+        lines = []
+        for n in range(start, min(start + 20, line_count)):
+            prefix = generator.choice(['+', '-', ' '])
+            lines.append(prefix + generator.choice(CODE_LINES).format(n=n))
+        hunks.append(f"@@ -{start + 1},{len(lines)} +{start + 1},{len(lines)} @@\n" + '\n'.join(lines) + '\n')
+    return ''.join(hunks)
@@ -0,0 +1,152 @@
+import hashlib
+import re
+from typing import List, Set, Tuple
+from models.code_review import CodeReview
+from models.comment import Comment
+
+HUNK_HEADER = re.compile(r'@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+SEVERITY_RANK = {'MUST': 3, 'SHOULD': 2, 'MAY': 1}
+
+# the CodeReview fields that hold a recommendation, in the order they are rendered
+COMMENT_FIELDS = [name for name, field in CodeReview.model_fields.items() if field.annotation is Comment]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in text using the ~4 characters per token rule of thumb.
+    """
+    return len(text) // 4 + 1
+
+
+def split_hunks(diff: str) -> Tuple[str, List[str]]:
+    """
+    Split a unified diff into the file header that precedes the first hunk and the list of hunks.
+    """
+    header: List[str] = []
+    hunks: List[List[str]] = []
+    for line in diff.splitlines(keepends=True):
+        if line.startswith('@@'):
+            hunks.append([line])
+        elif hunks:
+            hunks[-1].append(line)
+        else:
+            header.append(line)
+    return ''.join(header), [''.join(hunk) for hunk in hunks]
+
+
+def hunk_key(hunk: str) -> str:
+    """
+    Identify a hunk by its lines, leaving out the header whose line numbers shift when code above the hunk changes.
+    """
+    _, _, body = hunk.partition('\n')
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()[:16]
+
+
+def hunk_keys(diff: str) -> List[str]:
+    """
+    Return the keys of a diff's hunks, in order.
+    """
+    _, hunks = split_hunks(diff)
+    return [hunk_key(hunk) for hunk in hunks]
+
+
+def select_uncovered_hunks(diff: str, covered: Set[str]) -> str:
+    """
+    Return the part of a diff whose hunks are not in covered, with the file header, or '' when every hunk is covered.
+    """
+    header, hunks = split_hunks(diff)
+    uncovered = [hunk for hunk in hunks if hunk_key(hunk) not in covered]
+    return header + ''.join(uncovered) if uncovered else ''
+
+
+def split_oversized_hunk(hunk: str, budget_tokens: int) -> List[str]:
+    """
+    Split a hunk that exceeds the budget on its own into line-aligned pieces that each repeat the hunk header.
+    """
+    lines = hunk.splitlines(keepends=True)
+    start = next((i + 1 for i, line in enumerate(lines) if line.startswith('@@')), 0)
+    header = ''.join(lines[:start])
+    body = lines[start:]
+    pieces: List[str] = []
+    current = header
+    for line in body:
+        if current != header and estimate_tokens(current + line) > budget_tokens:
+            pieces.append(current)
+            current = header
+        current += line
+    if current != header:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_diff(diff: str, budget_tokens: int) -> List[str]:
+    """
+    Pack the hunks of a unified diff into as few chunks as possible, each within budget_tokens.
+    Every chunk starts with the diff's file header so it can be reviewed on its own.
+    """
+    return [chunk for chunk, _ in chunk_diff_hunks(diff, budget_tokens)]
+
+
+def chunk_diff_hunks(diff: str, budget_tokens: int) -> List[Tuple[str, List[str]]]:
+    """
+    Chunk a diff like chunk_diff, pairing each chunk with the keys of the hunks it covers. A hunk split across chunks
+    is covered by each of them.
+    """
+    header, hunks = split_hunks(diff)
+    if len(hunks) == 0 or estimate_tokens(diff) <= budget_tokens:
+        return [(diff, [hunk_key(hunk) for hunk in hunks])]
+    hunk_budget = max(1, budget_tokens - estimate_tokens(header))
+    chunks: List[Tuple[str, List[str]]] = []
+    current = ''
+    keys: List[str] = []
+    for hunk in hunks:
+        key = hunk_key(hunk)
+        pieces = split_oversized_hunk(hunk, hunk_budget) if estimate_tokens(hunk) > hunk_budget else [hunk]
+        for piece in pieces:
+            if current and estimate_tokens(current + piece) > hunk_budget:
+                chunks.append((header + current, keys))
+                current = ''
+                keys = []
+            current += piece
+            if key not in keys:
+                keys.append(key)
+    if current:
+        chunks.append((header + current, keys))
+    return chunks
+
+
+def merge_comments(comments: List[Comment]) -> Comment:
+    """
+    Merge the same recommendation field from several chunk reviews, keeping the strongest severity.
+    """
+    texts: List[str] = []
+    severity = ''
+    for comment in comments:
+        if comment.comment == '':
+            continue
+        if comment.comment not in texts:
+            texts.append(comment.comment)
+        if SEVERITY_RANK.get(comment.severity, 0) > SEVERITY_RANK.get(severity, 0):
+            severity = comment.severity
+    return Comment(comment='\n'.join(texts), severity=severity or (comments[0].severity if comments else ''))
+
+
+def merge_parts(parts: List[Tuple[List[str], CodeReview]], diff: str) -> CodeReview:
+    """
+    Merge the reviews of parts of a diff, each covering some of its hunks by key, weighting each by the size of its hunks.
+    """
+    _, hunks = split_hunks(diff)
+    sizes = {hunk_key(hunk): estimate_tokens(hunk) for hunk in hunks}
+    return merge_reviews([review for _, review in parts], [max(1, sum(sizes.get(key, 0) for key in keys)) for keys, _ in parts])
+
+
+def merge_reviews(reviews: List[CodeReview], weights: List[int]) -> CodeReview:
+    """
+    Merge per-chunk reviews into one per-file review. The score is the mean of the chunk scores weighted by chunk size.
+    """
+    if len(reviews) == 1:
+        return reviews[0]
+    score = sum(review.code_review_score * weight for review, weight in zip(reviews, weights)) / sum(weights)
+    merged = {name: merge_comments([getattr(review, name) for review in reviews]) for name in COMMENT_FIELDS}
+    return CodeReview(code_review_score=round(score), **merged)
@@ -0,0 +1,353 @@
+import json
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# built-in rules; a rules file given by FILE_RULES_PATH uses the same keys and extends them
+DEFAULT_RULES = {
+    'languages': {
+        '.py': 'Python',
+        '.js': 'JavaScript',
+        '.jsx': 'JavaScript',
+        '.ts': 'TypeScript',
+        '.tsx': 'TypeScript',
+        '.java': 'Java',
+        '.c': 'C',
+        '.cpp': 'C++',
+        '.cs': 'C#',
+        '.rb': 'Ruby',
+        '.go': 'Go',
+        '.php': 'PHP',
+        '.swift': 'Swift',
+        '.kt': 'Kotlin',
+        '.rs': 'Rust',
+        '.scala': 'Scala',
+        '.html': 'HTML',
+        '.css': 'CSS',
+        '.sql': 'SQL',
+        '.sh': 'Shell',
+        '.ps1': 'PowerShell',
+        '.tf': 'Terraform',
+        '.tfvars': 'Terraform',
+        '.tfstate': 'Terraform',
+        '.tfstate.backup': 'Terraform',
+        '.dockerfile': 'Docker',
+    },
+    'filenames': {
+        'Dockerfile': 'Docker',
+    },
+    'shebangs': {
+        'python': 'Python',
+        'python3': 'Python',
+        'node': 'JavaScript',
+        'ruby': 'Ruby',
+        'php': 'PHP',
+        'sh': 'Shell',
+        'bash': 'Shell',
+        'zsh': 'Shell',
+        'pwsh': 'PowerShell',
+    },
+    'documentation': ['.md', '.txt', '.rst', '.adoc'],
+    'configuration': ['.yml', '.yaml', '.json', '.ini', '.cfg', '.conf'],
+    # any path containing one of these is documentation or configuration
+    'documentation_keywords': ['docs'],
+    'configuration_keywords': ['config'],
+    'vendored': [
+        '**/vendor/**', '**/third_party/**', '**/node_modules/**', '**/bower_components/**', '**/Pods/**', '**/.yarn/**',
+        'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'Pipfile.lock', 'Cargo.lock',
+        'Gemfile.lock', 'composer.lock', 'go.sum',
+    ],
+    'generated': [
+        '*.min.js', '*.min.css', '*.map', '*_pb2.py', '*_pb2_grpc.py', '*.pb.go', '*.pb.cc', '*.pb.h',
+        '*.generated.*', '*.g.dart', '*.designer.cs', '**/dist/**', '**/__snapshots__/**',
+    ],
+}
+
+# markers that code generators put at the top of their output
+GENERATED_MARKER_PATTERN = re.compile(r'Code generated .* DO NOT EDIT|@generated|<auto-generated|autogenerated by|auto-generated by', re.IGNORECASE)
+
+# a hunk whose new side starts at line 1, so its first lines are the top of the file
+TOP_OF_FILE_HUNK = re.compile(r'@@ -\d+(,\d+)? \+1(,\d+)? @@')
+
+# bounds the memoized directory and suffix rules of a long running process
+MAX_MEMOIZED_RULES = 100000
+
+# only the start of a diff is searched for a shebang or a generated marker
+HEADER_LINES = 5
+HEADER_CHARS = 512
+
+
+def has_generated_marker(diff: str) -> bool:
+    """
+    Check the top of a file's diff for a code generator's marker.
+    """
+    if not TOP_OF_FILE_HUNK.match(diff):
+        return False
+    # every marker mentions 'generated'; checking for it first skips the regex for almost every file
+    head = diff[:HEADER_CHARS].lower()
+    return 'generated' in head and GENERATED_MARKER_PATTERN.search(head) is not None
+
+
+def suffix_parts(suffix: str) -> Iterator[str]:
+    """
+    Yield a multi-part suffix and its shorter suffixes, e.g. '.tfstate.backup' then '.backup'.
+    """
+    start = 0
+    while start != -1:
+        yield suffix[start:]
+        start = suffix.find('.', start + 1)
+
+
+def file_suffix(name: str) -> str:
+    """
+    Return the lowercased suffix of a file name from its first dot, ignoring the dot of a hidden file.
+    """
+    dot = name.find('.', 1)
+    return name[dot:].lower() if dot != -1 else ''
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a glob to a regex: ** crosses directories, * and ? do not.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(parts) + '$'
+
+
+def is_literal(text: str) -> bool:
+    return '*' not in text and '?' not in text and '/' not in text
+
+
+def header_lines(diff: str) -> List[str]:
+    """
+    Return the first lines of a file's new contents when its diff starts at the top of the file.
+    """
+    if not TOP_OF_FILE_HUNK.match(diff):
+        return []
+    lines = []
+    for line in diff.split('\n', HEADER_LINES + 1)[1:HEADER_LINES + 1]:
+        if line.startswith(('+', ' ')):
+            lines.append(line[1:])
+    return lines
+
+
+def compile_labelled(patterns: Dict[str, List[str]]) -> Optional[re.Pattern]:
+    """
+    Combine labelled globs into one regex with a named group per label.
+    """
+    groups = [f"(?P<{label}>{'|'.join(glob_to_regex(pattern) for pattern in globs)})" for label, globs in patterns.items() if globs]
+    return re.compile('|'.join(groups)) if groups else None
+
+
+class GlobIndex:
+    """
+    Labelled gitignore-style globs sorted by shape so most paths are matched with dictionary lookups: exact file names,
+    '*.suffix' patterns and '**/directory/**' patterns. The remaining globs are combined into one regex for file names
+    and one for globs containing a slash, which match from the repository root. Matches return the glob's label;
+    earlier labels win.
+    """
+    def __init__(self, labelled_patterns: Dict[str, List[str]]):
+        self.names: Dict[str, str] = {}
+        self.suffixes: Dict[str, str] = {}
+        self.directories: Dict[str, str] = {}
+        name_patterns: Dict[str, List[str]] = {}
+        path_patterns: Dict[str, List[str]] = {}
+        for label, patterns in reversed(list(labelled_patterns.items())):
+            name_patterns[label] = []
+            path_patterns[label] = []
+            for pattern in patterns:
+                if is_literal(pattern):
+                    self.names[pattern] = label
+                elif pattern.startswith('*.') and is_literal(pattern[1:]):
+                    self.suffixes[pattern[1:].lower()] = label
+                elif pattern.startswith('**/') and pattern.endswith('/**') and is_literal(pattern[3:-3]):
+                    self.directories[pattern[3:-3]] = label
+                elif '/' in pattern:
+                    path_patterns[label].append(pattern)
+                else:
+                    name_patterns[label].append(pattern)
+        self.name_pattern = compile_labelled(dict(reversed(list(name_patterns.items()))))
+        self.path_pattern = compile_labelled(dict(reversed(list(path_patterns.items()))))
+
+    def match_directory(self, directory: str) -> Optional[str]:
+        if self.directories and directory:
+            for part in directory.split('/'):
+                if part in self.directories:
+                    return self.directories[part]
+        return None
+
+    def match_suffix(self, suffix: str) -> Optional[str]:
+        """
+        Match a lowercased multi-part suffix such as '.min.js' against the '*.suffix' globs.
+        """
+        if self.suffixes and suffix:
+            for part in suffix_parts(suffix):
+                if part in self.suffixes:
+                    return self.suffixes[part]
+        return None
+
+    def match_name(self, file_path: str, name: str) -> Optional[str]:
+        """
+        Match the globs that depend on the whole file name or path.
+        """
+        label = self.names.get(name)
+        if label is None and self.name_pattern:
+            match = self.name_pattern.match(name)
+            label = match.lastgroup if match else None
+        if label is None and self.path_pattern:
+            match = self.path_pattern.match(file_path)
+            label = match.lastgroup if match else None
+        return label
+
+
+class FileClassifier:
+    """
+    Categorizes changed files as documentation, configuration, code or skipped (generated or vendored) and detects their
+    language. The rules are compiled once into suffix, file name and directory lookups, and what a directory or a file
+    suffix implies is memoized, so files sharing them cost a few dictionary lookups.
+    """
+    def __init__(self, rules: Dict):
+        self.languages: Dict[str, str] = {suffix.lower(): language for suffix, language in rules['languages'].items()}
+        self.filenames: Dict[str, str] = dict(rules['filenames'])
+        self.shebangs: Dict[str, str] = dict(rules['shebangs'])
+        self.categories: Dict[str, str] = {}
+        for suffix in rules['configuration']:
+            self.categories[suffix.lower()] = 'configuration'
+        for suffix in rules['documentation']:
+            self.categories[suffix.lower()] = 'documentation'
+        keywords = {category: '|'.join(re.escape(keyword.lower()) for keyword in rules[f'{category}_keywords']) for category in ('documentation', 'configuration')}
+        self.keyword_pattern = re.compile('|'.join(f'(?P<{category}>{pattern})' for category, pattern in keywords.items() if pattern)) if any(keywords.values()) else None
+        self.documentation_keyword_pattern = re.compile(keywords['documentation']) if keywords['documentation'] else None
+        self.skip_globs = GlobIndex({reason: rules[reason] for reason in ('vendored', 'generated')})
+        self.directory_rules: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self.suffix_rules: Dict[str, Tuple[Optional[str], Optional[str], str]] = {}
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> 'FileClassifier':
+        """
+        Build a classifier from the default rules extended by a JSON rules file: lists are appended to and mappings
+        are updated, so a rules file only needs to name what it adds or changes.
+        """
+        rules = {key: (dict(value) if isinstance(value, dict) else list(value)) for key, value in DEFAULT_RULES.items()}
+        if path:
+            with open(path, 'r') as file:
+                overrides = json.load(file)
+            for key, value in overrides.items():
+                if key not in rules:
+                    raise ValueError(f"Unknown file rule '{key}' in {path}")
+                if isinstance(rules[key], dict):
+                    rules[key].update(value)
+                else:
+                    rules[key].extend(value)
+        return cls(rules)
+
+    def keyword_category(self, text: str) -> Optional[str]:
+        match = self.keyword_pattern.search(text) if self.keyword_pattern else None
+        if match is None:
+            return None
+        # a documentation keyword later in the text still wins over a configuration keyword
+        if match.lastgroup == 'configuration' and self.documentation_keyword_pattern and self.documentation_keyword_pattern.search(text, match.end()):
+            return 'documentation'
+        return match.lastgroup
+
+    def directory_rule(self, directory: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Return the skip reason and keyword category a directory gives the files in it.
+        """
+        rule = self.directory_rules.get(directory)
+        if rule is None:
+            skip = self.skip_globs.match_directory(directory)
+            if len(self.directory_rules) >= MAX_MEMOIZED_RULES:
+                self.directory_rules.clear()
+            rule = self.directory_rules[directory] = (skip, self.keyword_category(directory.lower()))
+        return rule
+
+    def suffix_rule(self, suffix: str) -> Tuple[Optional[str], Optional[str], str]:
+        """
+        Return the skip reason, category and language a lowercased multi-part suffix such as '.tfstate.backup' implies.
+        The category comes from the last extension, the language from the longest suffix with a known language.
+        """
+        rule = self.suffix_rules.get(suffix)
+        if rule is None:
+            skip = self.skip_globs.match_suffix(suffix)
+            category = self.categories.get(suffix[suffix.rfind('.'):]) if suffix else None
+            language = next((self.languages[part] for part in suffix_parts(suffix) if part in self.languages), 'Unknown')
+            if len(self.suffix_rules) >= MAX_MEMOIZED_RULES:
+                self.suffix_rules.clear()
+            rule = self.suffix_rules[suffix] = (skip, category, language)
+        return rule
+
+    def detect_language(self, file_path: str, diff: str = '') -> str:
+        """
+        Detect a file's language from its name, its longest known suffix or, failing those, the shebang in its diff.
+        """
+        name = file_path.rsplit('/', 1)[-1]
+        if name in self.filenames:
+            return self.filenames[name]
+        language = self.suffix_rule(file_suffix(name))[2]
+        if language == 'Unknown' and diff:
+            language = self.shebang_language(diff)
+        return language
+
+    def shebang_language(self, diff: str) -> str:
+        lines = header_lines(diff)
+        if not lines or not lines[0].startswith('#!'):
+            return 'Unknown'
+        words = lines[0][2:].split()
+        # skip the env in '#!/usr/bin/env python3'
+        if words and words[0].endswith('/env') and len(words) > 1:
+            words = words[1:]
+        return self.shebangs.get(words[0].rsplit('/', 1)[-1], 'Unknown') if words else 'Unknown'
+
+    def classify(self, file_path: str, diff: str = '') -> Tuple[str, str]:
+        """
+        Return (category, language) for a file. Skipped files get their skip reason in place of a language.
+        """
+        directory, _, name = file_path.rpartition('/')
+        directory_skip, directory_category = self.directory_rule(directory)
+        suffix_skip, suffix_category, language = self.suffix_rule(file_suffix(name))
+        skip = directory_skip or suffix_skip or self.skip_globs.match_name(file_path, name)
+        if skip is None and diff and has_generated_marker(diff):
+            skip = 'generated'
+        if skip:
+            return 'skipped', skip
+        # documentation wins over configuration, by suffix or by keyword
+        name_category = self.keyword_category(name.lower())
+        for category in ('documentation', 'configuration'):
+            if category in (suffix_category, directory_category, name_category):
+                return category, 'N/A'
+        if name in self.filenames:
+            return 'code', self.filenames[name]
+        if language == 'Unknown' and diff:
+            language = self.shebang_language(diff)
+        return 'code', language
+
+
+_default_classifier: Optional[FileClassifier] = None
+
+
+def default_classifier() -> FileClassifier:
+    """
+    Return the classifier for the rules file named by FILE_RULES_PATH, compiled on first use.
+    """
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = FileClassifier.from_file(os.environ.get('FILE_RULES_PATH'))
+    return _default_classifier
@@ -0,0 +1,199 @@
+import json
+import os
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from models.code_review import CodeReview
+from models.test_file_review import TestFileReview
+from output.review_output import COMMENT_LABELS
+
+TEST_CATEGORY = "Review of Test"
+
+# finding categories and severities are stored as their index in these lists
+CATEGORIES = [TEST_CATEGORY] + list(COMMENT_LABELS.values())
+SEVERITIES = ['', 'MAY', 'SHOULD', 'MUST']
+SEVERITY_CODES = {severity: code for code, severity in enumerate(SEVERITIES)}
+
+# dimensions of a file row; findings can also be grouped by category and severity
+FILE_DIMENSIONS = ('language', 'directory')
+
+
+class Interned:
+    """
+    A column of repeated strings stored once each, with rows holding their codes.
+    """
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class FindingsStore:
+    """
+    Columnar store of review results: one row per reviewed file (language, directory, score, weight) and one per finding
+    (file, category, severity, comment), kept in typed arrays instead of per-row objects so large sweeps stay compact and
+    can be aggregated by language, directory, category and severity.
+    Scores are weighted by the number of changed lines, so a one-line fix does not count as much as a rewrite.
+    Not thread safe; merge requests are rendered into it one at a time.
+    """
+    def __init__(self, keep_comments: bool = True):
+        self.keep_comments = keep_comments
+        # file rows
+        self.paths: List[str] = []
+        self.languages = Interned()
+        self.directories = Interned()
+        self.language_codes = array('H')
+        self.directory_codes = array('I')
+        self.scores = array('h')
+        self.weights = array('I')
+        self.test_files = array('B')
+        # finding rows
+        self.finding_files = array('I')
+        self.categories = array('B')
+        self.severities = array('B')
+        self.comments: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def add(self, file_path: str, language: str, test_review: TestFileReview, code_review: CodeReview, weight: int = 1) -> None:
+        """
+        Add a file's review and its non-empty findings.
+        """
+        file_index = len(self.paths)
+        self.paths.append(file_path)
+        self.language_codes.append(self.languages.code(language))
+        self.directory_codes.append(self.directories.code(os.path.dirname(file_path) or '.'))
+        self.scores.append(code_review.code_review_score)
+        self.weights.append(max(1, weight))
+        self.test_files.append(1 if test_review.is_test_file else 0)
+
+        if test_review.is_test_file:
+            self.add_finding(file_index, 0, test_review.are_there_missing_test_scenarios)
+        for category, name in enumerate(COMMENT_LABELS, start=1):
+            self.add_finding(file_index, category, getattr(code_review, name))
+
+    def add_finding(self, file_index: int, category: int, comment) -> None:
+        if not comment or not comment.comment:
+            return
+        self.finding_files.append(file_index)
+        self.categories.append(category)
+        self.severities.append(SEVERITY_CODES.get(comment.severity.upper(), 0))
+        self.comments.append(comment.comment if self.keep_comments else '')
+
+    def extend(self, other: 'FindingsStore') -> None:
+        """
+        Append every row of another store, e.g. one merge request's results to a run-wide store.
+        """
+        offset = len(self.paths)
+        self.paths.extend(other.paths)
+        self.language_codes.extend(self.languages.code(other.languages.values[code]) for code in other.language_codes)
+        self.directory_codes.extend(self.directories.code(other.directories.values[code]) for code in other.directory_codes)
+        self.scores.extend(other.scores)
+        self.weights.extend(other.weights)
+        self.test_files.extend(other.test_files)
+        self.finding_files.extend(file_index + offset for file_index in other.finding_files)
+        self.categories.extend(other.categories)
+        self.severities.extend(other.severities)
+        self.comments.extend(other.comments if self.keep_comments else [''] * len(other.comments))
+
+    def has_tests(self) -> bool:
+        return any(self.test_files)
+
+    def count(self, severity: Optional[str] = None) -> int:
+        if severity is None:
+            return len(self.severities)
+        return self.severities.count(SEVERITY_CODES[severity])
+
+    def findings(self, severity: Optional[str] = None) -> Iterator[Tuple[str, str, str, str]]:
+        """
+        Iterate the (file_path, category, severity, comment) findings, optionally only those of one severity.
+        """
+        wanted = None if severity is None else SEVERITY_CODES[severity]
+        for file_index, category, code, comment in zip(self.finding_files, self.categories, self.severities, self.comments):
+            if wanted is None or code == wanted:
+                yield self.paths[file_index], CATEGORIES[category], SEVERITIES[code], comment
+
+    def final_score(self) -> float:
+        """
+        Return the changed-line weighted mean of the code review scores, or 10 when no file was reviewed.
+        """
+        total_weight = sum(self.weights)
+        if total_weight == 0:
+            return 10
+        return sum(score * weight for score, weight in zip(self.scores, self.weights)) / total_weight
+
+    def file_codes(self, dimension: str) -> Tuple[array, List[str]]:
+        """
+        Return a file dimension's code per file row and the values the codes stand for.
+        """
+        if dimension == 'language':
+            return self.language_codes, self.languages.values
+        if dimension == 'directory':
+            return self.directory_codes, self.directories.values
+        raise ValueError(f"Unknown file dimension: {dimension}")
+
+    def finding_codes(self, dimension: str) -> Tuple[Iterable[int], List[str]]:
+        """
+        Return a dimension's code per finding row and the values the codes stand for.
+        """
+        if dimension == 'category':
+            return self.categories, CATEGORIES
+        if dimension == 'severity':
+            return self.severities, SEVERITIES
+        if dimension in FILE_DIMENSIONS:
+            codes, values = self.file_codes(dimension)
+            return map(codes.__getitem__, self.finding_files), values
+        raise ValueError(f"Unknown finding dimension: {dimension}")
+
+    def score_by(self, dimension: str) -> Dict[str, Dict[str, float]]:
+        """
+        Group the files by language or directory into their weighted score and file count.
+        """
+        codes, values = self.file_codes(dimension)
+        weighted = [0] * len(values)
+        weights = [0] * len(values)
+        files = [0] * len(values)
+        for code, score, weight in zip(codes, self.scores, self.weights):
+            weighted[code] += score * weight
+            weights[code] += weight
+            files[code] += 1
+        return {value: {'score': weighted[code] / weights[code], 'files': files[code]} for code, value in enumerate(values) if files[code]}
+
+    def count_by(self, *dimensions: str) -> Dict[Tuple[str, ...], int]:
+        """
+        Count the findings grouped by any of language, directory, category and severity.
+        """
+        if not dimensions:
+            return {(): len(self.severities)}
+        columns = [self.finding_codes(dimension) for dimension in dimensions]
+        counts = Counter(zip(*(codes for codes, _ in columns)))
+        return {tuple(values[code] for code, (_, values) in zip(key, columns)): count for key, count in counts.items()}
+
+    def report(self) -> Dict:
+        """
+        Summarize the store for dashboards: the overall score and the scores and finding counts per group.
+        """
+        return {
+            'files': len(self.paths),
+            'findings': self.count(),
+            'final_score': self.final_score(),
+            'score_by_language': self.score_by('language'),
+            'score_by_directory': self.score_by('directory'),
+            'findings_by_severity': {severity: count for (severity,), count in self.count_by('severity').items()},
+            'findings_by_category': {category: count for (category,), count in self.count_by('category').items()},
+            'findings_by_language_and_severity': [
+                {'language': language, 'severity': severity, 'count': count}
+                for (language, severity), count in sorted(self.count_by('language', 'severity').items())
+            ],
+        }
+
+    def write_report(self, path: str) -> None:
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
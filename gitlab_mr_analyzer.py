@@ -1,289 +1,463 @@
 import os
 import sys
-import gitlab
-import ell
-from typing import List, Dict, Tuple
-from typing import List
-from llms import code_reviewer, is_test_file
+from concurrent.futures import Future, as_completed
+from typing import List, Dict, Optional, TextIO, Tuple
 from models.code_review import CodeReview
-from models.summary import Summary
-from vcs.gitlab import GitLab
-from vcs.github import GitHub
-from rich.table import Table
-from rich.console import Console
-from rich import box
+from models.review_comment import ReviewComment
+from models.test_file_review import TestFileReview
+from file_classifier import default_classifier
+from findings_store import FindingsStore
+from instrumentation import Tracer
+from review_cache import ReviewCache
+from review_dedup import ReviewDeduplicator, shared_review
+from review_engine import ReviewEngine
+from review_router import ReviewRouter
+from review_publisher import publish_review, review_comments
+from diff_chunker import hunk_keys, merge_parts
+from review_pipeline import ReviewContext, completed, plan_batches, plan_incremental, review_batch, review_file, review_incremental, succeeded
+from review_state import ReviewPart, ReviewState
+from standards_registry import StandardsRegistry
+from test_classifier import ClassifierStats
+from llm.llm_backend import LARGE_MODEL, LLMBackend
+from vcs.change_set import ChangeSet
+from vcs.version_control import VersionControl
+from output.plain_output import PlainOutput
+from output.review_output import ReviewOutput, ReviewProgress
 
-ell.init(verbose=False)
+# VCS backends, LLM providers and rich rendering are imported when a run selects them, so usage errors and
+# local-only runs do not pay for loading gitlab, PyGithub, ell or rich
+
+# spans and per-file token counts the review service keeps in its tracer
+RESIDENT_TRACE_ENTRIES = 10000
 
 def detect_programming_language(file_path: str) -> str:
     """
-    Detect the programming language of a file based on its extension.
-    """
-    extension_to_language = {
-        '.py': 'Python',
-        '.js': 'JavaScript',
-        '.jsx': 'JavaScript',
-        '.ts': 'TypeScript',
-        '.tsx': 'TypeScript',
-        '.java': 'Java',
-        '.c': 'C',
-        '.cpp': 'C++',
-        '.cs': 'C#',
-        '.rb': 'Ruby',
-        '.go': 'Go',
-        '.php': 'PHP',
-        '.swift': 'Swift',
-        '.kt': 'Kotlin',
-        '.rs': 'Rust',
-        '.scala': 'Scala',
-        '.html': 'HTML',
-        '.css': 'CSS',
-        '.sql': 'SQL',
-        '.sh': 'Shell',
-        '.ps1': 'PowerShell',
-        '.sql': 'SQL',
-        '.tf': 'Terraform',
-        '.tfvars': 'Terraform',
-        '.tfstate': 'Terraform',
-        '.tfstate.backup': 'Terraform',
-        '.tfvars': 'Terraform',
-        '.dockerfile': 'Docker',
-        'Dockerfile': 'Docker',
-    }
-    
-    _, ext = os.path.splitext(file_path)
-    return extension_to_language.get(ext.lower(), 'Unknown')
+    Detect the programming language of a file based on its name and extension.
+    """
+    return default_classifier().detect_language(file_path)
 
-def categorize_file(file_path: str) -> Tuple[str, str]:
+def categorize_file(file_path: str, diff: str = '') -> Tuple[str, str]:
     """
-    Categorize a file as documentation, configuration, or code based on its extension and path.
-    Also return the programming language for code files.
+    Categorize a file as documentation, configuration, code or skipped (generated or vendored) based on its name, path and
+    the start of its diff. Also return the programming language for code files and the reason for skipped files.
     """
-    documentation_extensions = ['.md', '.txt', '.rst', '.adoc']
-    configuration_extensions = ['.yml', '.yaml', '.json', '.ini', '.cfg', '.conf']
-    
-    _, ext = os.path.splitext(file_path)
-    
-    if ext in documentation_extensions or 'docs' in file_path.lower():
-        return 'documentation', 'N/A'
-    elif ext in configuration_extensions or 'config' in file_path.lower():
-        return 'configuration', 'N/A'
-    else:
-        language = detect_programming_language(file_path)
-        return 'code', language
+    return default_classifier().classify(file_path, diff)
 
-def analyze_merge_request(changed_files: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+def analyze_merge_request(changed_files: List[str], changes: Optional[ChangeSet] = None) -> Dict[str, List[Tuple[str, str]]]:
     """
-    Analyze a merge request and categorize its files.
+    Analyze a merge request and categorize its files. With the changes, shebangs and generated-code markers are detected too.
     """
     
     categorized_files = {
         'documentation': [],
         'configuration': [],
-        'code': []
+        'code': [],
+        'skipped': []
     }
     
+    classifier = default_classifier()
     for file_path in changed_files:
-        category, language = categorize_file(file_path)
+        change = changes.get(file_path) if changes is not None else None
+        category, language = classifier.classify(file_path, change.diff if change else '')
         categorized_files[category].append((file_path, language))
     
     return categorized_files
 
-# create a function that will read the contents of standards/coding/*.txt where the input is the language and that will be the filename. The function should accept a cache of coding standards and first check to see if its already in the cache.
-def read_coding_standards(language: str, cache: Dict[str, str]) -> str:
-    """
-    Read the contents of the coding standards file for a given programming language.
-    """
-    filename = f'standards/coding/{language.lower()}.txt'
-    if filename not in cache:
-        with open(filename, 'r') as file:
-            cache[filename] = file.read()
-    return cache[filename]
-
-# create a function that will accept a list of code review scores and return a single score
-def calculate_final_score(scores: List[int]) -> int:
-    """
-    Calculate the final score based on the list of scores.
-    """
-    # if length of scores is 0, return 10
-    if len(scores) == 0:
-        return 10
-    return sum(scores) / len(scores)
-
-# return a list of summaries
-def print_review_details(file_path: str, language: str, review: CodeReview) -> List[Summary]:
-    """
-    Print the details of a code review for a specific file.
-
-    Args:
-    file_path (str): The path of the file being reviewed.
-    language (str): The programming language of the file.
-    review (CodeReview): The CodeReview object containing the review details.
-    """
-    print(f"  - {file_path} (Language: {language})")
-    print(f"    Code Review Score: {review.code_review_score}/10")
-    table_header = f"Score: {review.code_review_score}/10: {file_path}"
-
-    has_code_review = False
-    console = Console()
-    my_table = Table(title=table_header)
-    my_table.add_column("Category", justify="left", style="cyan", no_wrap=True)
-    my_table.add_column("Severity", justify="left", style="red", no_wrap=True)
-    my_table.add_column("Recommendation", style="green", no_wrap=False)        
-
-    summaries: List[Summary] = []
-
-    if review.make_it_succint:
-        has_code_review = True
-        my_table.add_row("Make it concise", review.make_it_succint.severity, review.make_it_succint.comment)
-        if review.make_it_succint.severity == "MUST":
-            summaries.append(Summary(category="Code Review", severity="MUST", recommendation=review.make_it_succint.comment, file_name=file_path))
-    if review.make_it_faster:
-        has_code_review = True
-        my_table.add_row("Make it faster", review.make_it_faster.severity, review.make_it_faster.comment)
-        if review.make_it_faster.severity == "MUST":
-            summaries.append(Summary(category="Code Review", severity="MUST", recommendation=review.make_it_faster.comment, file_name=file_path))
-    if review.make_it_more_secure:
-        has_code_review = True
-        my_table.add_row("Make it more secure", review.make_it_more_secure.severity, review.make_it_more_secure.comment)
-        if review.make_it_more_secure.severity == "MUST":
-            summaries.append(Summary(category="Code Review", severity="MUST", recommendation=review.make_it_more_secure.comment, file_name=file_path))
-    if review.make_it_more_efficient:
-        has_code_review = True
-        my_table.add_row("Make it more efficient", review.make_it_more_efficient.severity, review.make_it_more_efficient.comment)
-        if review.make_it_more_efficient.severity == "MUST":
-            summaries.append(Summary(category="Code Review", severity="MUST", recommendation=review.make_it_more_efficient.comment, file_name=file_path))
-    if review.make_it_more_readable:
-        has_code_review = True
-        my_table.add_row("Make it more readable", review.make_it_more_readable.severity, review.make_it_more_readable.comment)
-        if review.make_it_more_readable.severity == "MUST":
-            summaries.append(Summary(category="Code Review", severity="MUST", recommendation=review.make_it_more_readable.comment, file_name=file_path))
-    if review.make_it_more_testable:
-        has_code_review = True
-        my_table.add_row("Make it more testable", review.make_it_more_testable.severity, review.make_it_more_testable.comment)
-        if review.make_it_more_testable.severity == "MUST":
-            summaries.append(Summary(category="Code Review", severity="MUST", recommendation=review.make_it_more_testable.comment, file_name=file_path))
-
-    if has_code_review:
-        console.print(my_table)
-
-    return summaries
+def create_llm_backend() -> LLMBackend:
+    """
+    Return the LLM backend selected by LLM_BACKEND: ell (default) calls the OpenAI models, stub runs offline.
+    """
+    backend = os.environ.get('LLM_BACKEND', 'ell').lower()
+    if backend == 'stub':
+        from llm.stub import StubBackend
+        return StubBackend.from_env()
+    if backend == 'ell':
+        from llm.ell_backend import EllBackend
+        return EllBackend()
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+
+def create_vcs(mr_url: str) -> Tuple[VersionControl, Optional[str]]:
+    """
+    Pick the version control backend for a merge request URL, pull request URL or local git range, and its token.
+    """
+    # if mr_url is a github url, then use the GitHub class
+    if 'github.com' in mr_url:
+        from vcs.github import GitHub
+        return GitHub(mr_url), os.environ.get('GITHUB_TOKEN')
+    # a <base>..<head> range is read from the local repository in LOCAL_REPO_DIR
+    if '://' not in mr_url and '..' in mr_url:
+        from vcs.local_git import LocalGit
+        return LocalGit(mr_url, os.environ.get('LOCAL_REPO_DIR', '.')), None
+    from vcs.gitlab import GitLab
+    return GitLab(mr_url), os.environ.get('GITLAB_TOKEN')
+
+def create_review_context(resident: bool = False) -> ReviewContext:
+    """
+    Build the backend, engine, cache, classifier stats, tracer, standards, review state, output, dedup index, model router and
+    findings store shared by every review in a run. A resident context, kept by the review service for its lifetime,
+    bounds what its tracer keeps and has no findings report, since there is no end of run to write it at.
+    """
+    publish = os.environ.get('REVIEW_PUBLISH', 'off').lower() in ('on', '1', 'true')
+    if resident and os.environ.get('REVIEW_FINDINGS_REPORT'):
+        raise ValueError("REVIEW_FINDINGS_REPORT is not supported by the review service")
+    # run-wide findings are only kept when a report of them is written
+    findings = FindingsStore() if os.environ.get('REVIEW_FINDINGS_REPORT') else None
+    return ReviewContext(create_llm_backend(), ReviewEngine.from_env(), ReviewCache.from_env(), ClassifierStats(), Tracer(RESIDENT_TRACE_ENTRIES if resident else None), StandardsRegistry.from_env(), ReviewState.from_env(), create_output(), publish, ReviewDeduplicator.from_env(), ReviewRouter.from_env(), findings)
+
+class MergeRequestReview:
+    """
+    A merge request whose file reviews have been submitted: its categorized files and a pending review per reviewable code file,
+    plus the version control client and changes its findings are posted back with.
+    """
+    def __init__(self, mr_url: str, project_path: str, categorized_files: Dict[str, List[Tuple[str, str]]], reviews: Dict[str, Future], progress: ReviewProgress, head_sha: str = '',
+                 vcs: Optional[VersionControl] = None, vcs_client=None, changes: Optional[ChangeSet] = None, state_key: str = '',
+                 identities: Optional[Dict[str, str]] = None, parts: Optional[Dict[str, List[ReviewPart]]] = None):
+        self.mr_url = mr_url
+        self.project_path = project_path
+        self.categorized_files = categorized_files
+        self.reviews = reviews
+        self.progress = progress
+        self.head_sha = head_sha
+        self.vcs = vcs
+        self.vcs_client = vcs_client
+        self.changes = changes if changes is not None else ChangeSet([])
+        # where the review state of the merge request is kept, the identity each file is reviewed with and, for files
+        # reviewed incrementally, the parts of their review
+        self.state_key = state_key
+        self.identities = identities or {}
+        self.parts = parts or {}
+
+def start_review(context: ReviewContext, vcs: VersionControl, vcs_client, mr_url: str) -> MergeRequestReview:
+    """
+    Fetch and categorize a merge request's changes and submit a review for every code file with coding standards.
+    """
+    tracer = context.tracer
+    with tracer.span('vcs_fetch'):
+        changes = vcs.checkout_changes(vcs_client, vcs.project_path(), vcs.change_id())
+
+    with tracer.span('classification'):
+        result = analyze_merge_request(changes.paths(), changes)
+    tracer.count('skipped_files', len(result['skipped']))
+
+    project_path = vcs.project_path()
+    with tracer.span('standards_loading'):
+        standards = {language: context.standards.get(language, project_path) for language in {language for _, language in result['code']}}
+
+    items = []
+    for file_path, language in result['code']:
+        if standards[language] is None:
+            continue
+        if file_path not in changes:
+            continue
+        items.append((file_path, language, changes[file_path].diff))
+
+    reviews = {}
+    progress = ReviewProgress()
+    # with review state, only the hunks not covered by the stored reviews of the merge request are reviewed again
+    review_key = state_key(vcs, mr_url)
+    identities = {file_path: context.review_identity(standards[language]) for file_path, language, _ in items}
+    parts = {}
+    head_sha = ''
+    resumed = {}
+    reused = set()
+    if context.state:
+        with tracer.span('vcs_fetch'):
+            head_sha = vcs.head_sha(vcs_client, project_path, vcs.change_id())
+        # files checkpointed by an earlier run of this head that did not finish are not reviewed again
+        checkpoints = context.state.checkpoints(review_key, head_sha, identities)
+        resumed = {file_path: checkpoints[file_path] for file_path, _, _ in items if file_path in checkpoints}
+        items = [item for item in items if item[0] not in resumed]
+        tracer.count('resumed_files', len(resumed))
+        incremental, items = plan_incremental(items, context.state.file_reviews(review_key), identities)
+        for (file_path, language, contents), uncovered_diff, test_review, kept in incremental:
+            parts[file_path] = kept
+            if not uncovered_diff:
+                reused.add(file_path)
+                reviews[file_path] = completed({file_path: (test_review, merge_parts(kept, contents))})
+                progress.set([file_path], 'done')
+                continue
+            tracer.count('incremental_partial_files')
+            tier = route(context, file_path, language, uncovered_diff)
+            reviews[file_path] = context.engine.submit(progress.track([file_path], review_incremental), context, file_path, contents, uncovered_diff, standards[language], test_review, kept, tier)
+        tracer.count('incremental_reused_files', len(reused))
+    for file_path, prior in resumed.items():
+        reviews[file_path] = completed({file_path: prior})
+        progress.set([file_path], 'done')
+
+    # files whose diffs match one already reviewed in this run share its review instead of being reviewed again
+    dedup_plan = None
+    if context.dedup:
+        with tracer.span('deduplication'):
+            dedup_plan = context.dedup.plan(items, standards)
+        items = dedup_plan.leaders
+
+    # leaders' promises are settled even when submitting fails part way, so duplicates in later merge requests never wait forever
+    try:
+        # trivial changes are linted locally and low-risk ones go to the small model; only large model reviews are batched
+        tiers = {file_path: route(context, file_path, language, contents) for file_path, language, contents in items}
+        routed = [item for item in items if tiers[item[0]] != LARGE_MODEL]
+        items = [item for item in items if tiers[item[0]] == LARGE_MODEL]
+
+        # small files of the same language can share one review request when batching is enabled
+        if os.environ.get('REVIEW_BATCH', 'off').lower() in ('on', '1', 'true'):
+            batches, singles = plan_batches(items, int(os.environ.get('REVIEW_BATCH_FILE_TOKENS', '1500')), int(os.environ.get('REVIEW_BATCH_TOKENS', '6000')))
+        else:
+            batches, singles = [], items
+        singles = routed + singles
+
+        for batch in batches:
+            future = context.engine.submit(progress.track([file_path for file_path, _, _ in batch], review_batch), context, batch, standards[batch[0][1]])
+            for file_path, _, _ in batch:
+                reviews[file_path] = future
+        for file_path, language, contents in singles:
+            # the chunks of a file reviewed on its own are stored as separate parts, so a later push re-reviews only its changed ones
+            parts[file_path] = []
+            reviews[file_path] = context.engine.submit(progress.track([file_path], review_file), context, file_path, language, contents, standards[language], tiers[file_path], parts[file_path])
+    finally:
+        if dedup_plan:
+            dedup_plan.settle(reviews)
+
+    if dedup_plan:
+        for file_path, leader_path, promise, kind in dedup_plan.duplicates:
+            tracer.count(f'dedup_{kind}_files')
+            reviews[file_path] = shared_review(promise, leader_path, file_path)
+            progress.set([file_path], 'queued')
+            reviews[file_path].add_done_callback(lambda future, path=file_path: progress.set([path], 'failed' if future.exception() else 'done'))
+
+    if context.state:
+        for file_path, future in reviews.items():
+            if file_path not in resumed and file_path not in reused:
+                future.add_done_callback(lambda future, path=file_path: checkpoint_review(context, review_key, head_sha, identities[path], path, future))
+    return MergeRequestReview(mr_url, project_path, result, reviews, progress, head_sha, vcs, vcs_client, changes, review_key, identities, parts)
+
+def route(context: ReviewContext, file_path: str, language: str, contents: str) -> str:
+    """
+    Return the tier a diff is reviewed with: the large model unless routing is enabled.
+    """
+    if context.router is None:
+        return LARGE_MODEL
+    return context.router.route(file_path, language, contents)
+
+def state_key(vcs: VersionControl, mr_url: str) -> str:
+    """
+    Key a merge request's review state by its project as well as its URL, since a local base..head range names the same
+    change in every repository.
+    """
+    return f"{vcs.project_path()}|{mr_url}"
+
+def checkpoint_review(context: ReviewContext, review_key: str, head_sha: str, identity: str, file_path: str, future: Future) -> None:
+    """
+    Store a file review as soon as it completes, so a run that fails later resumes without redoing its LLM calls.
+    """
+    if succeeded(future):
+        context.state.checkpoint(review_key, head_sha, identity, file_path, future.result()[file_path])
+
+def save_review_state(context: ReviewContext, review: MergeRequestReview) -> None:
+    """
+    Remember the completed file reviews of a merge request for the next incremental run. Files whose review was not
+    collected in parts, such as batched or shared reviews, are stored as a single part covering all their hunks.
+    """
+    if context.state is None:
+        return
+    results = {}
+    for file_path, future in review.reviews.items():
+        if succeeded(future):
+            test_review, code_review = future.result()[file_path]
+            parts = review.parts.get(file_path) or [(hunk_keys(review.changes[file_path].diff), code_review)]
+            results[file_path] = (review.identities[file_path], test_review, parts)
+    context.state.save(review.state_key, results)
+
+class ReviewResult:
+    """
+    What rendering a merge request concluded: its final score, number of MUST findings and missing-tests verdict, the
+    comments to post back when publishing is enabled and how many file reviews failed. A merge request with failed
+    file reviews has only a partial result.
+    """
+    def __init__(self, final_score: float, must_count: int, missing_tests: bool, comments: List[ReviewComment], failed: int = 0):
+        self.final_score = final_score
+        self.must_count = must_count
+        self.missing_tests = missing_tests
+        self.comments = comments
+        self.failed = failed
+
+def render_review(context: ReviewContext, review: MergeRequestReview) -> ReviewResult:
+    """
+    Write the analysis of a merge request, streaming each file review as it completes.
+    """
+    tracer = context.tracer
+    output = context.output
+    # finding comments are kept only for outputs that print them at the end
+    findings = FindingsStore(keep_comments=output.collects_summaries)
+    # MUST and SHOULD findings to post back, collected only when publishing
+    comments: List[ReviewComment] = []
+
+    output.merge_request(review.mr_url)
+    for category, files in review.categorized_files.items():
+        if category != 'code':
+            output.file_list(category, files)
+
+    code_files = review.categorized_files['code']
+    output.message("\nCode:")
+    # files reviewed together in a batch share one future
+    pending: Dict[Future, List[Tuple[str, str]]] = {}
+    for file_path, language in code_files:
+        if context.standards.get(language, review.project_path) is None:
+            output.message(f"Warning: Coding standards file for {language} not found: {file_path}")
+        elif file_path not in review.reviews:
+            output.message(f"Error: File {file_path} not found in merge request changes.")
+        else:
+            pending.setdefault(review.reviews[file_path], []).append((file_path, language))
+
+    # a file whose review failed is reported and left out of the score instead of failing the whole merge request
+    failed = 0
+    results: Dict[str, Tuple[TestFileReview, CodeReview]] = {}
+    with output.progress(review.progress):
+        for future in as_completed(pending):
+            for file_path, language in pending[future]:
+                try:
+                    results[file_path] = test_review, code_review = future.result()[file_path]
+                except Exception as e:
+                    failed += 1
+                    output.message(f"Error: Review of {file_path} failed: {e}")
+                    continue
+                with tracer.span('rendering', file_path):
+                    output.file_review(file_path, language, test_review, code_review)
+
+    # file reviews stream in completion order, but the findings behind the summary and the posted comments follow
+    # the merge request's file order so they are the same on every run
+    for file_path, language in code_files:
+        if file_path not in results:
+            continue
+        test_review, code_review = results[file_path]
+        change = review.changes.get(file_path)
+        findings.add(file_path, language, test_review, code_review, change.additions + change.deletions if change else 1)
+        if context.publish:
+            comments.extend(review_comments(file_path, review.changes, test_review, code_review))
+
+    tracer.count('failed_files', failed)
+    final_score = findings.final_score()
+    must_count = findings.count('MUST')
+    # a file whose review failed may have been the test, so tests are only reported missing when every review completed
+    missing_tests = len(code_files) > 0 and failed == 0 and not findings.has_tests()
+    if failed:
+        output.message(f"Warning: {failed} file reviews failed; the score covers only the files that were reviewed.")
+    output.summary(final_score, findings, missing_tests)
+    if context.findings is not None:
+        context.findings.extend(findings)
+    return ReviewResult(final_score, must_count, missing_tests, comments, failed)
+
+def publish_result(context: ReviewContext, review: MergeRequestReview, result: ReviewResult) -> None:
+    """
+    Post a rendered merge request's findings back to it when publishing is enabled. Kept apart from render_review so
+    callers do not hold their output lock during the network calls. A partial result is not posted.
+    """
+    if not context.publish:
+        return
+    if result.failed:
+        context.output.message(f"Not posting to {review.mr_url}: {result.failed} file reviews failed")
+        return
+    with context.tracer.span('publishing'):
+        posted = publish_review(review.vcs, review.vcs_client, result.comments, result.final_score, result.must_count, result.missing_tests)
+    context.tracer.count('published_comments', posted)
+    context.output.message(f"Posted {posted} new review comments to {review.mr_url}")
+
+def create_output() -> ReviewOutput:
+    """
+    Return the output selected by REVIEW_OUTPUT: rich tables with live progress on a terminal, plain lines otherwise,
+    or the jsonl and sarif machine-readable formats, written to REVIEW_OUTPUT_PATH when set.
+    """
+    mode = os.environ.get('REVIEW_OUTPUT', 'auto').lower()
+    if mode == 'auto':
+        mode = 'rich' if sys.stdout.isatty() else 'plain'
+    if mode == 'rich':
+        from output.rich_output import RichOutput
+        return RichOutput()
+    if mode == 'plain':
+        return PlainOutput()
+    if mode in ('jsonl', 'sarif'):
+        path = os.environ.get('REVIEW_OUTPUT_PATH')
+        stream = open(path, 'w', encoding='utf-8') if path else None
+        if mode == 'jsonl':
+            from output.jsonl_output import JsonLinesOutput
+            return JsonLinesOutput(stream)
+        from output.sarif_output import SarifOutput
+        return SarifOutput(stream)
+    raise ValueError(f"Unknown REVIEW_OUTPUT: {mode}")
+
+def console_stream() -> TextIO:
+    """
+    Return the stream for messages meant for people rather than for the review output: stderr when a jsonl or sarif
+    output is written to stdout, so they do not corrupt it.
+    """
+    if os.environ.get('REVIEW_OUTPUT', 'auto').lower() in ('jsonl', 'sarif') and not os.environ.get('REVIEW_OUTPUT_PATH'):
+        return sys.stderr
+    return sys.stdout
+
+def finish_run(context: ReviewContext) -> None:
+    """
+    Report the run's classifier hit rate and routing decisions and write the trace outputs that are enabled.
+    """
+    tracer = context.tracer
+    context.output.message(context.classifier_stats.summary())
+    if context.router:
+        context.output.message(context.router.stats.summary())
+        for tier, count in context.router.stats.files.items():
+            tracer.count(f'routed_{tier}', count)
+    tracer.count('llm_retries', context.engine.retries)
+    for name, count in context.backend.counters().items():
+        tracer.count(name, count)
+    for decision, count in context.classifier_stats.decisions.items():
+        tracer.count(f'test_classifier_{decision}', count)
+    if context.findings is not None:
+        context.findings.write_report(os.environ['REVIEW_FINDINGS_REPORT'])
+    if os.environ.get('REVIEW_TRACE_FILE'):
+        tracer.write(os.environ['REVIEW_TRACE_FILE'])
+    if os.environ.get('REVIEW_TRACE_SUMMARY', 'off').lower() in ('on', '1', 'true'):
+        tracer.print_summary(console_stream())
+
+def error_message(e: Exception) -> str:
+    """
+    Describe a failed merge request review for the user.
+    """
+    if isinstance(e, ValueError):
+        return f"Error: {e}"
+    # a GitLab error can only have been raised once the GitLab backend was imported
+    gitlab = sys.modules.get('gitlab')
+    if gitlab is not None and isinstance(e, gitlab.exceptions.GitlabAuthenticationError):
+        return "Error: GitLab authentication failed. Make sure GITLAB_TOKEN environment variable is set correctly."
+    if gitlab is not None and isinstance(e, gitlab.exceptions.GitlabGetError):
+        return "Error: Failed to retrieve merge request. Make sure the URL is correct and you have access to the project."
+    if isinstance(e, FileNotFoundError):
+        return f"Error: File not found - {e}"
+    if isinstance(e, PermissionError):
+        return f"Error: Permission denied - {e}"
+    return f"An unexpected error occurred: {e}"
 
 def main() -> None:
     if len(sys.argv) != 2:
-        print("Usage: python gitlab_mr_analyzer.py <GitLab_MR_URL>")
+        print("Usage: python gitlab_mr_analyzer.py <GitLab_MR_URL | GitHub_PR_URL | base..head>")
         sys.exit(1)
 
     mr_url = sys.argv[1]
-    
-    # if mr_url is a github url, then use the GitHub class
-    if 'github.com' in mr_url:
-        vcs = GitHub(mr_url)
-        token = os.environ.get('GITHUB_TOKEN')
-    else:
-        vcs = GitLab(mr_url)
-        token = os.environ.get('GITLAB_TOKEN')
-    
-    # a collection of summaries of type Summary     
-    summaries: List[Summary] = []
+    vcs, token = create_vcs(mr_url)
+    context = None
 
     try:
-        domain = vcs.domain()
-        project_path = vcs.project_path()
-        mr_iid = vcs.change_id()
-        
-        vcs_client = vcs.client(domain, token)
-
-        changed_files_resp = vcs.checkout_changes(vcs_client, project_path, mr_iid)
-        changed_files = [change['new_path'] for change in changed_files_resp]
-        result = analyze_merge_request(changed_files)
-
-        # read the contents of standards/coding/common.txt 
-        with open('standards/coding/common.txt', 'r') as file:
-            common_coding_standards = file.read()
-            
-        coding_standards_by_language = {}
-        scores = []
-        has_code_changes = False
-        has_tests = False
-
-        print(f"Merge Request Analysis for {mr_url}:")
-        for category, files in result.items():
-            print(f"\n{category.capitalize()}:")
-            for file_path, language in files:
-                if category == 'code':
-                    has_code_changes = True
-                    # check to see if the coding standards file exists in standards/coding/
-                    if not os.path.exists(f'standards/coding/{language.lower()}.txt'):
-                        print(f"Warning: Coding standards file for {language} not found: {file_path}")
-                        continue
-
-                    changes = vcs.checkout_changes(vcs_client, project_path, mr_iid)
-                    for change in changes:
-                        if change['new_path'] == file_path:
-                            contents = change['diff']
-                            break
-                    else:
-                        print(f"Error: File {file_path} not found in merge request changes.")
-                        continue
-
-                    review_message = is_test_file(language, contents)
-                    review = review_message.parsed
-                    if review.is_test_file:
-                        has_tests = True
-                        if review.are_there_missing_test_scenarios.comment != "":
-                            table_header = f"Test File Review for {file_path} (Language: {language})"
-                            console = Console()
-                            my_table = Table(title=table_header)
-                            my_table.add_column("Category", justify="left", style="red", no_wrap=True)
-                            my_table.add_column("Severity", justify="center", style="red", no_wrap=True)
-                            my_table.add_column("Recommendation", style="green", no_wrap=False)
-                            my_table.add_row("Review of Test", review.are_there_missing_test_scenarios.severity, review.are_there_missing_test_scenarios.comment)
-                            console.print(my_table)
-                            if review.are_there_missing_test_scenarios.severity == "MUST":
-                                summaries.append(Summary(category="Test", severity="MUST", recommendation=review.are_there_missing_test_scenarios.comment, file_name=file_path))
-
-                    coding_standards = common_coding_standards + read_coding_standards(language, coding_standards_by_language)
-                    review_message = code_reviewer(coding_standards, contents)
-                    review = review_message.parsed
-                    scores.append(review.code_review_score)
-                    summaries.extend(print_review_details(file_path, language, review))
-                else:
-                    print(f"  - {file_path}")
-
-        if has_code_changes and not has_tests:
-            print("CRITICAL: No test files detected.")
-
-        final_score = calculate_final_score(scores)
-        print(f"Final Score: {final_score}/10")
-        if len(summaries) > 0:
-            console = Console()
-            my_table = Table(title="Summary of MUST Findings", show_lines=True, box=box.MINIMAL_DOUBLE_HEAD)
-            my_table.add_column("Category", justify="left", style="red", no_wrap=True)
-            my_table.add_column("Severity", justify="center", style="red", no_wrap=True)
-            my_table.add_column("File", style="white", no_wrap=False)
-            my_table.add_column("Recommendation", style="green", no_wrap=False)
-            for summary in summaries:
-                my_table.add_row(summary.category, summary.severity, summary.file_name, summary.recommendation)
-            console.print(my_table)
-
-    except ValueError as e:
-        print(f"Error: {e}")
-        sys.exit(1)
-    except gitlab.exceptions.GitlabAuthenticationError:
-        print("Error: GitLab authentication failed. Make sure GITLAB_TOKEN environment variable is set correctly.")
-        sys.exit(1)
-    except gitlab.exceptions.GitlabGetError:
-        print("Error: Failed to retrieve merge request. Make sure the URL is correct and you have access to the project.")
-        sys.exit(1)
-    except FileNotFoundError as e:
-        print(f"Error: File not found - {e}")
-        sys.exit(1)
-    except PermissionError as e:
-        print(f"Error: Permission denied - {e}")
-        sys.exit(1)
+        context = create_review_context()
+        vcs_client = vcs.client(vcs.domain(), token)
+        with context.output.fetching(mr_url):
+            review = start_review(context, vcs, vcs_client, mr_url)
+        result = render_review(context, review)
+        save_review_state(context, review)
+        publish_result(context, review, result)
+        finish_run(context)
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        print(error_message(e), file=console_stream())
+        sys.exit(1)
+    finally:
+        if context:
+            context.close()
+    if result.failed:
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+import contextlib
+import json
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterator, Optional, TextIO
+
+
+class Tracer:
+    """
+    Records timed spans per stage and file, LLM token counts and run counters such as cache hits and retries.
+    With max_entries, as in the resident service, only the latest spans and files are kept; stage and token totals
+    still cover the whole run.
+    """
+    def __init__(self, max_entries: Optional[int] = None):
+        self.started = time.perf_counter()
+        self.max_entries = max_entries
+        self.spans: Deque[Dict] = deque(maxlen=max_entries)
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        self.token_totals: Dict[str, int] = {'prompt_tokens': 0, 'completion_tokens': 0}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, stage: str, file_path: str = '') -> Iterator[None]:
+        """
+        Time the enclosed block as one span of stage, optionally attributed to a file.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            duration = ended - started
+            with self.lock:
+                self.spans.append({
+                    'stage': stage,
+                    'file': file_path,
+                    'start': started - self.started,
+                    'duration': duration,
+                    'thread': threading.current_thread().name,
+                })
+                total = self.stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0})
+                total['count'] += 1
+                total['total'] += duration
+                total['max'] = max(total['max'], duration)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += amount
+
+    def add_tokens(self, file_path: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self.lock:
+            tokens = self.tokens.get(file_path)
+            if tokens is None:
+                if self.max_entries is not None and len(self.tokens) >= self.max_entries:
+                    # the file seen longest ago makes room
+                    del self.tokens[next(iter(self.tokens))]
+                tokens = self.tokens[file_path] = {'prompt_tokens': 0, 'completion_tokens': 0}
+            tokens['prompt_tokens'] += prompt_tokens
+            tokens['completion_tokens'] += completion_tokens
+            self.token_totals['prompt_tokens'] += prompt_tokens
+            self.token_totals['completion_tokens'] += completion_tokens
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """
+        Call counts, summed and maximum durations per stage.
+        """
+        with self.lock:
+            return {stage: dict(total) for stage, total in self.stages.items()}
+
+    def write(self, path: str) -> None:
+        """
+        Write the spans, per-stage totals, token counts and counters as a JSON trace file.
+        """
+        with self.lock:
+            trace = {
+                'wall_seconds': time.perf_counter() - self.started,
+                'spans': list(self.spans),
+                'counters': dict(self.counters),
+                # token counts are estimated from prompt and response sizes
+                'estimated_tokens': {file_path: dict(tokens) for file_path, tokens in self.tokens.items()},
+            }
+        trace['stages'] = self.stage_totals()
+        with open(path, 'w') as file:
+            json.dump(trace, file, indent=2)
+
+    def print_summary(self, stream: TextIO = sys.stdout) -> None:
+        """
+        Print the per-stage timings and run counters to stream as an end-of-run table.
+        """
+        from rich import box
+        from rich.table import Table
+        from output.rich_output import console_for
+        my_table = Table(title="Run Instrumentation", box=box.MINIMAL_DOUBLE_HEAD)
+        my_table.add_column("Stage", justify="left", style="cyan", no_wrap=True)
+        my_table.add_column("Calls", justify="right", style="white")
+        my_table.add_column("Total (s)", justify="right", style="green")
+        my_table.add_column("Max (s)", justify="right", style="green")
+        for stage, total in sorted(self.stage_totals().items(), key=lambda item: -item[1]['total']):
+            my_table.add_row(stage, str(int(total['count'])), f"{total['total']:.3f}", f"{total['max']:.3f}")
+        console_for(stream).print(my_table)
+
+        prompt_tokens, completion_tokens = self.token_totals['prompt_tokens'], self.token_totals['completion_tokens']
+        counters = ', '.join(f"{name}={value}" for name, value in sorted(self.counters.items()))
+        print(f"Estimated tokens: {prompt_tokens} prompt, {completion_tokens} completion. {counters}", file=stream)
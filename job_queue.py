@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'mr-analyzer', 'jobs.sqlite3')
+
+# finished jobs are purged at most this often while the service runs
+PURGE_INTERVAL_SECONDS = 3600
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the queue already holds its maximum number of pending jobs.
+    """
+    pass
+
+
+class JobQueue:
+    """
+    Persistent SQLite queue of merge request review jobs. A newer push to a merge request that is still waiting
+    replaces the queued job instead of adding another one, and a merge request is reviewed by one worker at a time.
+    Done and failed jobs are kept for retention_days, which is also how long a repeated event for an already reviewed
+    head is answered as a duplicate.
+    """
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, max_pending: int = 100, retention_days: float = 7):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_pending = max_pending
+        self.retention_seconds = retention_days * 86400
+        self.purged_at = 0.0
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mr_url TEXT NOT NULL,
+                head_sha TEXT NOT NULL,
+                status TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                error TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, enqueued_at)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_mr_url ON jobs (mr_url, status)")
+        # jobs that were running when the service stopped are picked up again
+        self.connection.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+        # which may leave two waiting jobs for a merge request; the newest head is kept
+        self.connection.execute("""
+            DELETE FROM jobs WHERE status = 'pending'
+            AND id NOT IN (SELECT MAX(id) FROM jobs WHERE status = 'pending' GROUP BY mr_url)
+        """)
+        self.purge_locked()
+        self.connection.commit()
+
+    def enqueue(self, mr_url: str, head_sha: str) -> str:
+        """
+        Queue a review of mr_url at head_sha. Returns 'queued' for a new job, 'superseded' when it replaced a waiting
+        job for the same merge request, or 'duplicate' when that head is already waiting, being reviewed or was the
+        last one reviewed. Raises QueueFullError when the queue is at capacity.
+        """
+        now = time.time()
+        with self.lock:
+            if head_sha and head_sha == self.latest_head_locked(mr_url):
+                return 'duplicate'
+            row = self.connection.execute("SELECT id FROM jobs WHERE mr_url = ? AND status = 'pending'", (mr_url,)).fetchone()
+            if row is not None:
+                self.connection.execute("UPDATE jobs SET head_sha = ?, updated_at = ? WHERE id = ?", (head_sha, now, row[0]))
+                self.connection.commit()
+                return 'superseded'
+            if self.pending_count_locked() >= self.max_pending:
+                raise QueueFullError(f"Review queue is full ({self.max_pending} pending jobs)")
+            self.connection.execute(
+                "INSERT INTO jobs (mr_url, head_sha, status, enqueued_at, updated_at) VALUES (?, ?, 'pending', ?, ?)",
+                (mr_url, head_sha, now, now),
+            )
+            self.connection.commit()
+            self.available.notify()
+            return 'queued'
+
+    def claim(self, timeout: float) -> Optional[Tuple[int, str, str]]:
+        """
+        Take the oldest pending job of a merge request that is not being reviewed already and mark it running, waiting
+        up to timeout seconds for one to become available. Returns (job_id, mr_url, head_sha) or None.
+        """
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            while True:
+                row = self.connection.execute("""
+                    SELECT id, mr_url, head_sha FROM jobs WHERE status = 'pending'
+                    AND mr_url NOT IN (SELECT mr_url FROM jobs WHERE status = 'running')
+                    ORDER BY enqueued_at LIMIT 1
+                """).fetchone()
+                if row is not None:
+                    self.connection.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), row[0]))
+                    self.connection.commit()
+                    return row
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.available.wait(remaining)
+
+    def complete(self, job_id: int, error: str = '') -> None:
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                ('failed' if error else 'done', error, time.time(), job_id),
+            )
+            self.connection.commit()
+            if time.time() - self.purged_at >= PURGE_INTERVAL_SECONDS:
+                self.purge_locked()
+                self.connection.commit()
+            # a job waiting for this merge request can be claimed now
+            self.available.notify_all()
+
+    def purge_locked(self) -> None:
+        """
+        Delete done and failed jobs last updated more than the retention period ago.
+        """
+        self.purged_at = time.time()
+        self.connection.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (self.purged_at - self.retention_seconds,),
+        )
+
+    def latest_head_locked(self, mr_url: str) -> str:
+        """
+        The head of the merge request's newest job that is waiting, running or was reviewed successfully.
+        """
+        row = self.connection.execute(
+            "SELECT head_sha FROM jobs WHERE mr_url = ? AND status IN ('pending', 'running', 'done') ORDER BY id DESC LIMIT 1",
+            (mr_url,),
+        ).fetchone()
+        return row[0] if row else ''
+
+    def pending_count_locked(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+
+    def counts(self) -> dict:
+        with self.lock:
+            return dict(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
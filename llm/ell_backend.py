@@ -0,0 +1,54 @@
+from typing import Dict, List, Tuple
+from pydantic import ValidationError
+from llm.llm_backend import LARGE_MODEL, SMALL_MODEL, LLMBackend
+from llm.ell_store import init_ell
+from llm.structured_output import MalformedResponseError, parse_response
+from llms import batch_code_reviewer, code_reviewer, is_test_file, BATCH_REVIEW_PROMPT_VERSION, CODE_REVIEW_MODEL, CODE_REVIEW_PROMPT_VERSION, SMALL_CODE_REVIEW_MODEL, TEST_FILE_MODEL, TEST_FILE_PROMPT_VERSION
+from models.batch_code_review import BatchCodeReview
+from models.code_review import CodeReview
+from models.test_file_review import TestFileReview
+
+def structured_call(model, prompt, *args, **kwargs):
+    """
+    Call an ell prompt and parse its response into model, repairing near misses. Responses that cannot be repaired,
+    including those the provider fails to validate, raise MalformedResponseError so the engine asks again.
+    """
+    try:
+        message = prompt(*args, **kwargs)
+    except ValidationError as e:
+        raise MalformedResponseError(f"Response does not match {model.__name__}: {e}") from e
+    return parse_response(message, model)
+
+class EllBackend(LLMBackend):
+    """
+    Calls the OpenAI models through the ell prompts in llms.py.
+    """
+    provider = 'openai'
+    models = {LARGE_MODEL: CODE_REVIEW_MODEL, SMALL_MODEL: SMALL_CODE_REVIEW_MODEL}
+
+    def __init__(self):
+        # the one ell configuration of the process, with invocation logging when ELL_STORE is on
+        self.store = init_ell()
+
+    def cache_identity(self, kind: str, tier: str = LARGE_MODEL) -> str:
+        return {
+            'code_reviewer': f"{self.models[tier]}:{CODE_REVIEW_PROMPT_VERSION}",
+            'is_test_file': f"{TEST_FILE_MODEL}:{TEST_FILE_PROMPT_VERSION}",
+            'batch_code_reviewer': f"{CODE_REVIEW_MODEL}:{BATCH_REVIEW_PROMPT_VERSION}",
+        }[kind]
+
+    def code_review(self, coding_standards: str, contents: str, tier: str = LARGE_MODEL) -> CodeReview:
+        return structured_call(CodeReview, code_reviewer, coding_standards, contents, api_params={'model': self.models[tier]})
+
+    def test_file_review(self, language: str, contents: str) -> TestFileReview:
+        return structured_call(TestFileReview, is_test_file, language, contents)
+
+    def batch_code_review(self, coding_standards: str, files: List[Tuple[str, str]]) -> BatchCodeReview:
+        return structured_call(BatchCodeReview, batch_code_reviewer, coding_standards, files)
+
+    def counters(self) -> Dict[str, int]:
+        return dict(self.store.counters) if self.store else {}
+
+    def close(self) -> None:
+        if self.store:
+            self.store.close()
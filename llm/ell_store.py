@@ -0,0 +1,301 @@
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+import ell
+from ell.store import BlobStore, Store
+from ell.stores.sql import SQLiteStore
+from ell.types import Invocation, SerializedLMP
+from ell.types.studio import InvocationContents, InvocationTrace
+from sqlmodel import Session, delete, select, text
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'mr-analyzer', 'ell')
+
+# invocations written to the store in one transaction
+FLUSH_BATCH = 200
+
+# expired invocations are deleted this many at a time
+DELETE_BATCH = 500
+
+# blob files younger than this may still be waiting for their invocation row and are not treated as orphaned
+ORPHAN_GRACE_SECONDS = 3600
+
+
+def sampled(invocation_id: str, sample_rate: float) -> bool:
+    """
+    Decide from its id whether an invocation is logged, so its blob, its row and traces to it agree.
+    """
+    return zlib.crc32(invocation_id.encode('utf-8')) < sample_rate * 2 ** 32
+
+
+class BufferedBlobStore(BlobStore):
+    """
+    Hands the contents of large invocations to the buffered store's writer instead of writing them during the call.
+    """
+    def __init__(self, store: 'BufferedStore'):
+        self.store = store
+
+    def store_blob(self, blob: bytes, blob_id: str) -> str:
+        self.store.enqueue(('blob', blob, blob_id), blob_id)
+        return blob_id
+
+    def retrieve_blob(self, blob_id: str) -> bytes:
+        return self.store.target.blob_store.retrieve_blob(blob_id)
+
+
+class BufferedStore(Store):
+    """
+    ell store that keeps prompt and response logging off the review path: sampled invocations go to a bounded in-memory
+    buffer that a background thread flushes in batches to a local SQLite store. When the buffer is full invocations are
+    dropped and counted rather than slowing the review down. The writer also deletes invocations past the retention
+    age or beyond the maximum count and compacts the database.
+    """
+    def __init__(self, path: str = DEFAULT_STORE_PATH, sample_rate: float = 1.0, max_buffer: int = 1000, flush_interval: float = 2.0,
+                 retention_days: float = 30, max_invocations: int = 100000, compact_interval: float = 3600):
+        self.target = SQLiteStore(path)
+        super().__init__(BufferedBlobStore(self))
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.max_invocations = max_invocations
+        self.compact_interval = compact_interval
+        self.buffer: queue.Queue = queue.Queue(maxsize=max(1, max_buffer))
+        # invocations whose contents blob was dropped are dropped too
+        self.dropped_ids: Set[str] = set()
+        # and blobs of invocations that were dropped are not written if they are still buffered
+        self.orphaned_ids: Set[str] = set()
+        self.counters: Dict[str, int] = {'ell_store_written': 0, 'ell_store_sampled_out': 0, 'ell_store_dropped': 0, 'ell_store_failed': 0}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.writer = threading.Thread(target=self.run, name='ell-store-writer', daemon=True)
+        self.writer.start()
+
+    @classmethod
+    def from_env(cls) -> Optional['BufferedStore']:
+        """
+        Configure the store from ELL_STORE_PATH, ELL_STORE_SAMPLE_RATE, ELL_STORE_BUFFER, ELL_STORE_FLUSH_SECONDS,
+        ELL_STORE_RETENTION_DAYS and ELL_STORE_MAX_INVOCATIONS. Returns None unless ELL_STORE is on.
+        """
+        if os.environ.get('ELL_STORE', 'off').lower() not in ('on', '1', 'true'):
+            return None
+        return cls(
+            path=os.environ.get('ELL_STORE_PATH', DEFAULT_STORE_PATH),
+            sample_rate=float(os.environ.get('ELL_STORE_SAMPLE_RATE', '1')),
+            max_buffer=int(os.environ.get('ELL_STORE_BUFFER', '1000')),
+            flush_interval=float(os.environ.get('ELL_STORE_FLUSH_SECONDS', '2')),
+            retention_days=float(os.environ.get('ELL_STORE_RETENTION_DAYS', '30')),
+            max_invocations=int(os.environ.get('ELL_STORE_MAX_INVOCATIONS', '100000')),
+        )
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += amount
+
+    def enqueue(self, item: tuple, invocation_id: str) -> None:
+        """
+        Buffer an invocation's blob or row if it is sampled, dropping it when the buffer is full.
+        """
+        if not sampled(invocation_id, self.sample_rate):
+            if item[0] == 'invocation':
+                self.count('ell_store_sampled_out')
+            return
+        with self.lock:
+            dropped = invocation_id in self.dropped_ids
+            if dropped and item[0] == 'invocation':
+                self.dropped_ids.discard(invocation_id)
+        if not dropped:
+            try:
+                self.buffer.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+        with self.lock:
+            if item[0] == 'blob':
+                self.dropped_ids.add(invocation_id)
+            else:
+                self.orphaned_ids.add(invocation_id)
+                self.counters['ell_store_dropped'] += 1
+
+    def write_lmp(self, serialized_lmp: SerializedLMP, uses: Dict[str, Any]) -> Optional[Any]:
+        # prompt versions are written once each and invocations depend on them, so they wait for room instead of being dropped
+        self.buffer.put(('lmp', serialized_lmp, uses))
+        return None
+
+    def write_invocation(self, invocation: Invocation, consumes: Set[str]) -> Optional[Any]:
+        self.enqueue(('invocation', invocation, consumes), invocation.id)
+        return None
+
+    def get_cached_invocations(self, lmp_id: str, state_cache_key: str) -> List[Invocation]:
+        return self.target.get_cached_invocations(lmp_id, state_cache_key)
+
+    def get_versions_by_fqn(self, fqn: str) -> List[SerializedLMP]:
+        return self.target.get_versions_by_fqn(fqn)
+
+    def drain(self) -> List[tuple]:
+        """
+        Wait up to the flush interval for buffered items and take up to a batch of them.
+        """
+        try:
+            items = [self.buffer.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(items) < FLUSH_BATCH:
+            try:
+                items.append(self.buffer.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def flush(self, items: List[tuple]) -> None:
+        """
+        Write buffered items in order, batching consecutive invocations into one transaction.
+        """
+        invocations = []
+        for item in items + [('end',)]:
+            if item[0] == 'invocation':
+                invocations.append(item[1:])
+                continue
+            if invocations:
+                self.write_invocations(invocations)
+                invocations = []
+            try:
+                if item[0] == 'lmp':
+                    self.target.write_lmp(item[1], item[2])
+                elif item[0] == 'blob' and not self.take_orphaned(item[2]):
+                    self.target.blob_store.store_blob(item[1], item[2])
+            except Exception:
+                self.count('ell_store_failed')
+
+    def take_orphaned(self, invocation_id: str) -> bool:
+        with self.lock:
+            if invocation_id not in self.orphaned_ids:
+                return False
+            self.orphaned_ids.discard(invocation_id)
+            return True
+
+    def write_invocations(self, invocations: List[tuple]) -> None:
+        missing = 0
+        try:
+            with Session(self.target.engine) as session:
+                for invocation, consumes in invocations:
+                    lmp = session.exec(select(SerializedLMP).filter(SerializedLMP.lmp_id == invocation.lmp_id)).first()
+                    if lmp is None:
+                        # the prompt version failed to write
+                        missing += 1
+                        continue
+                    lmp.num_invocations = (lmp.num_invocations or 0) + 1
+                    session.add(invocation.contents)
+                    session.add(invocation)
+                    for consumed_id in consumes:
+                        if sampled(consumed_id, self.sample_rate):
+                            session.add(InvocationTrace(invocation_consumer_id=invocation.id, invocation_consuming_id=consumed_id))
+                session.commit()
+            self.count('ell_store_written', len(invocations) - missing)
+            self.count('ell_store_failed', missing)
+        except Exception:
+            self.count('ell_store_failed', len(invocations))
+
+    def compact(self) -> None:
+        """
+        Delete invocations older than the retention age or beyond the maximum count, with their contents, traces and
+        blobs, and reclaim the space they took. Blob files whose invocation row was dropped are deleted as well.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        with Session(self.target.engine) as session:
+            expired = list(session.exec(select(Invocation.id).where(Invocation.created_at < cutoff)).all())
+            if self.max_invocations > 0:
+                expired += session.exec(
+                    select(Invocation.id).where(Invocation.created_at >= cutoff).order_by(Invocation.created_at.desc()).offset(self.max_invocations)
+                ).all()
+            for start in range(0, len(expired), DELETE_BATCH):
+                ids = expired[start:start + DELETE_BATCH]
+                external = session.exec(select(InvocationContents.invocation_id).where(InvocationContents.invocation_id.in_(ids), InvocationContents.is_external)).all()
+                session.exec(delete(InvocationTrace).where(InvocationTrace.invocation_consumer_id.in_(ids) | InvocationTrace.invocation_consuming_id.in_(ids)))
+                session.exec(delete(InvocationContents).where(InvocationContents.invocation_id.in_(ids)))
+                session.exec(delete(Invocation).where(Invocation.id.in_(ids)))
+                session.commit()
+                for invocation_id in external:
+                    try:
+                        os.remove(self.target.blob_store._get_blob_path(invocation_id))
+                    except OSError:
+                        pass
+        # blobs written before their row was dropped are found by the sweep below
+        with self.lock:
+            self.orphaned_ids.clear()
+        for path in self.orphaned_blobs():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if expired:
+            with self.target.engine.connect() as connection:
+                connection.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+
+    def orphaned_blobs(self) -> List[str]:
+        """
+        Return the paths of blob files older than the grace period that no invocation's contents refer to, such as the
+        blob of an invocation whose row was dropped from a full buffer after the blob was accepted.
+        """
+        root = self.target.blob_store.db_dir
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        blobs: Dict[str, str] = {}
+        for directory, _, files in os.walk(root):
+            # blobs are stored as <type>/<2 chars>/<2 chars>/<rest of the id>
+            parts = os.path.relpath(directory, root).split(os.sep)
+            if len(parts) != 3:
+                continue
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        blobs[f"{parts[0]}-{parts[1]}{parts[2]}{name}"] = path
+                except OSError:
+                    pass
+        ids = list(blobs)
+        with Session(self.target.engine) as session:
+            for start in range(0, len(ids), DELETE_BATCH):
+                batch = ids[start:start + DELETE_BATCH]
+                for invocation_id in session.exec(select(InvocationContents.invocation_id).where(InvocationContents.invocation_id.in_(batch))).all():
+                    del blobs[invocation_id]
+        return list(blobs.values())
+
+    def run(self) -> None:
+        """
+        Flush the buffer until the store is closed, compacting on start and then every compact interval.
+        """
+        compacted_at = 0.0
+        while not (self.stopping.is_set() and self.buffer.empty()):
+            if time.monotonic() - compacted_at >= self.compact_interval:
+                try:
+                    self.compact()
+                except Exception:
+                    self.count('ell_store_failed')
+                compacted_at = time.monotonic()
+            items = self.drain()
+            if items:
+                self.flush(items)
+
+    def close(self) -> None:
+        """
+        Flush what is still buffered and stop the writer, reporting invocations that were not logged.
+        """
+        self.stopping.set()
+        # wakes the writer if it is waiting for items
+        self.buffer.put(('stop',))
+        self.writer.join()
+        if self.counters['ell_store_dropped'] or self.counters['ell_store_failed']:
+            sys.stderr.write(f"ell store: {self.counters['ell_store_dropped']} invocations dropped, {self.counters['ell_store_failed']} writes failed\n")
+
+
+def init_ell() -> Optional[BufferedStore]:
+    """
+    Configure ell once for the process: invocation logging to the buffered store when ELL_STORE is on, and no
+    automatic commit messages, which would cost an extra model call per changed prompt.
+    """
+    store = BufferedStore.from_env()
+    ell.init(store=store, verbose=False, autocommit=False)
+    return store
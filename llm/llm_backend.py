@@ -0,0 +1,41 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+from models.batch_code_review import BatchCodeReview
+from models.code_review import CodeReview
+from models.test_file_review import TestFileReview
+
+# model tiers a code review can be routed to
+LARGE_MODEL = 'large'
+SMALL_MODEL = 'small'
+
+class LLMBackend(ABC):
+    # the provider name requests are rate limited under
+    provider = ''
+
+    @abstractmethod
+    def cache_identity(self, kind: str, tier: str = LARGE_MODEL) -> str:
+        """Return the model and prompt version behind a call kind (code_reviewer, is_test_file or batch_code_reviewer) and model tier, for cache keys."""
+        pass
+
+    @abstractmethod
+    def code_review(self, coding_standards: str, contents: str, tier: str = LARGE_MODEL) -> CodeReview:
+        """Review a diff against the coding standards with the model of a tier."""
+        pass
+
+    @abstractmethod
+    def test_file_review(self, language: str, contents: str) -> TestFileReview:
+        """Decide whether a diff belongs to a test file and review its missing test scenarios."""
+        pass
+
+    @abstractmethod
+    def batch_code_review(self, coding_standards: str, files: List[Tuple[str, str]]) -> BatchCodeReview:
+        """Review several (file_path, contents) diffs against the same coding standards in one request."""
+        pass
+
+    def counters(self) -> Dict[str, int]:
+        """Return run counters of the backend, such as how many invocations were logged."""
+        return {}
+
+    def close(self) -> None:
+        """Flush and release what the backend holds open."""
+        pass
@@ -0,0 +1,93 @@
+import json
+import re
+import typing
+from typing import Any, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+from models.comment import Comment
+
+T = TypeVar('T', bound=BaseModel)
+
+CODE_FENCE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+TRAILING_COMMA = re.compile(r',\s*([}\]])')
+SEVERITY = re.compile(r'\b(MUST|SHOULD|MAY)\b', re.IGNORECASE)
+
+
+class MalformedResponseError(Exception):
+    """
+    A model response that could not be parsed into the expected schema, even after repair.
+    Asking the model again usually yields a valid response, so the review engine retries it.
+    """
+    retryable = True
+
+
+def extract_json(text: str) -> str:
+    """
+    Cut the JSON object out of a response that wraps it in a code fence or prose, without trailing commas.
+    """
+    fenced = CODE_FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        raise MalformedResponseError("Response contains no JSON object")
+    return TRAILING_COMMA.sub(r'\1', text[start:end + 1])
+
+
+def repair_comment(value: Any) -> Any:
+    """
+    Coerce the usual near misses into a Comment: a missing or null comment, a bare string, or a severity in the wrong
+    case or only mentioned at the end of the comment, as the field descriptions ask for.
+    """
+    if value is None:
+        return {'comment': '', 'severity': ''}
+    if isinstance(value, str):
+        value = {'comment': value}
+    if not isinstance(value, dict):
+        return value
+    comment = value.get('comment') or ''
+    severity = str(value.get('severity') or '').strip().upper()
+    if not severity and comment:
+        found = SEVERITY.findall(comment)
+        severity = found[-1].upper() if found else ''
+    return {'comment': comment, 'severity': severity}
+
+
+def repair_fields(model: Type[BaseModel], data: Any) -> Any:
+    """
+    Repair the Comment fields of a model's data, recursing into nested models and lists of them.
+    """
+    if not isinstance(data, dict):
+        return data
+    repaired = dict(data)
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if annotation is Comment:
+            repaired[name] = repair_comment(repaired.get(name))
+        elif isinstance(annotation, type) and issubclass(annotation, BaseModel) and name in repaired:
+            repaired[name] = repair_fields(annotation, repaired[name])
+        elif typing.get_origin(annotation) in (list, typing.List) and isinstance(repaired.get(name), list):
+            (item_model,) = typing.get_args(annotation)
+            if isinstance(item_model, type) and issubclass(item_model, BaseModel):
+                repaired[name] = [repair_fields(item_model, item) for item in repaired[name]]
+    return repaired
+
+
+def repair_structured_output(text: str, model: Type[T]) -> T:
+    """
+    Parse a response's text into model, repairing what can be repaired. Raises MalformedResponseError otherwise.
+    """
+    try:
+        data = json.loads(extract_json(text))
+        return model.model_validate(repair_fields(model, data))
+    except (ValueError, ValidationError) as e:
+        raise MalformedResponseError(f"Response does not match {model.__name__}: {e}") from e
+
+
+def parse_response(message, model: Type[T]) -> T:
+    """
+    Return the parsed content of an ell message, falling back to repairing its text when the provider could not parse it.
+    """
+    parsed = message.parsed
+    if isinstance(parsed, model):
+        return parsed
+    return repair_structured_output(message.text_only, model)
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import List, Tuple
+from llm.llm_backend import LARGE_MODEL, LLMBackend
+from llm.structured_output import repair_structured_output
+from models.batch_code_review import BatchCodeReview, FileCodeReview
+from models.code_review import CodeReview
+from models.comment import Comment
+from models.test_file_review import TestFileReview
+
+SEVERITIES = ['', 'MAY', 'SHOULD', 'MUST']
+
+
+class StubLLMError(Exception):
+    """
+    An injected provider failure. It carries a 429 status code so the review engine treats it as retryable.
+    """
+    status_code = 429
+
+
+class StubBackend(LLMBackend):
+    """
+    Offline backend that returns schema-valid reviews derived from a hash of the input, for benchmarks and load tests.
+    The same input always yields the same review; latency, failures and malformed responses can be injected.
+    """
+    provider = 'stub'
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0, malformed_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'StubBackend':
+        """
+        Build a stub configured from STUB_LLM_LATENCY (seconds), STUB_LLM_FAILURE_RATE (0-1), STUB_LLM_SEED and
+        STUB_LLM_MALFORMED_RATE (0-1).
+        """
+        return cls(
+            latency=float(os.environ.get('STUB_LLM_LATENCY', '0')),
+            failure_rate=float(os.environ.get('STUB_LLM_FAILURE_RATE', '0')),
+            seed=int(os.environ.get('STUB_LLM_SEED', '0')),
+            malformed_rate=float(os.environ.get('STUB_LLM_MALFORMED_RATE', '0')),
+        )
+
+    def cache_identity(self, kind: str, tier: str = LARGE_MODEL) -> str:
+        return f'stub:{tier}'
+
+    def simulate_call(self) -> bool:
+        """
+        Sleep for the configured latency and raise an injected failure at the configured rate.
+        Returns whether the response should come back malformed.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            failed = self.random.random() < self.failure_rate
+            malformed = self.random.random() < self.malformed_rate
+        if failed:
+            raise StubLLMError("Injected stub LLM failure")
+        return malformed
+
+    def malformed(self, review: CodeReview) -> CodeReview:
+        """
+        Send a review through the structured output repair the way a model's near miss would arrive: fenced in prose,
+        with lowercase severities, empty comments left out and a trailing comma.
+        """
+        fields = {'code_review_score': review.code_review_score}
+        for name in CodeReview.model_fields:
+            comment = getattr(review, name)
+            if name != 'code_review_score' and comment.comment:
+                fields[name] = {'comment': comment.comment, 'severity': comment.severity.lower()}
+        text = f"Here is the review:\n```json\n{json.dumps(fields, indent=2)[:-1]},\n}}\n```"
+        return repair_structured_output(text, CodeReview)
+
+    def comment(self, digest: bytes, index: int, topic: str) -> Comment:
+        severity = SEVERITIES[digest[index] % len(SEVERITIES)]
+        if severity == '':
+            return Comment(comment='', severity='')
+        return Comment(comment=f"Stub recommendation to {topic} ({severity}).", severity=severity)
+
+    def review_for(self, contents: str) -> CodeReview:
+        digest = hashlib.sha256(contents.encode('utf-8')).digest()
+        return CodeReview(
+            code_review_score=4 + digest[0] % 7,
+            make_it_succint=self.comment(digest, 1, 'make it more concise'),
+            make_it_faster=self.comment(digest, 2, 'make it faster'),
+            make_it_more_secure=self.comment(digest, 3, 'make it more secure'),
+            make_it_more_efficient=self.comment(digest, 4, 'make it more efficient'),
+            make_it_more_readable=self.comment(digest, 5, 'make it more readable'),
+            make_it_more_testable=self.comment(digest, 6, 'make it more testable'),
+        )
+
+    def code_review(self, coding_standards: str, contents: str, tier: str = LARGE_MODEL) -> CodeReview:
+        malformed = self.simulate_call()
+        review = self.review_for(contents)
+        return self.malformed(review) if malformed else review
+
+    def test_file_review(self, language: str, contents: str) -> TestFileReview:
+        self.simulate_call()
+        digest = hashlib.sha256(contents.encode('utf-8')).digest()
+        return TestFileReview(
+            is_test_file='test' in contents.lower(),
+            review_score=4 + digest[0] % 7,
+            are_there_missing_test_scenarios=self.comment(digest, 7, 'cover more test scenarios'),
+        )
+
+    def batch_code_review(self, coding_standards: str, files: List[Tuple[str, str]]) -> BatchCodeReview:
+        self.simulate_call()
+        return BatchCodeReview(reviews=[FileCodeReview(file_path=file_path, review=self.review_for(contents)) for file_path, contents in files])
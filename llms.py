@@ -1,38 +1,51 @@
 import ell
+from typing import List, Tuple
+from models.batch_code_review import BatchCodeReview
 from models.code_review import CodeReview
 from models.test_file_review import TestFileReview
 
-ell.init(verbose=False)
+# ell is configured once, by the ell backend through llm.ell_store
 
-@ell.complex(model="gpt-4o-2024-08-06", response_format=CodeReview, temperature=0.1)
+# Bump a prompt version whenever its prompt text changes so cached reviews from the old prompt are not reused
+CODE_REVIEW_MODEL = "gpt-4o-2024-08-06"
+# low-risk changes are reviewed with the same prompt on this cheaper, faster model
+SMALL_CODE_REVIEW_MODEL = "gpt-4o-mini-2024-07-18"
+CODE_REVIEW_PROMPT_VERSION = "2"
+TEST_FILE_MODEL = "gpt-4o-2024-08-06"
+TEST_FILE_PROMPT_VERSION = "1"
+BATCH_REVIEW_PROMPT_VERSION = "2"
+
+# Instructions and standards go first and the code last, so every review of a language shares a prompt prefix the
+# provider can cache across the files of a run.
+REVIEW_ASPECTS = """
+Provide a detailed code review addressing the following aspects:
+1. Overall code quality (score out of 10)
+2. Suggestions to make the code more concise
+3. Suggestions to make the code faster
+4. Suggestions to make the code more secure
+5. Suggestions to make the code more efficient
+6. Suggestions to make the code more readable
+7. Suggestions to make the code more testable
+"""
+
+@ell.complex(model=CODE_REVIEW_MODEL, response_format=CodeReview, temperature=0.1)
 def code_reviewer(coding_standards: str, contents: str):
     """
     Perform a code review based on the given coding standards and file contents.
     """
-    prompt = f"""
-    You are an expert code reviewer. Please review the following code based on the provided coding standards.
-    
-    Coding Standards:
-    {coding_standards}
-    
-    Code to review:
-    {contents}
-    
-    Provide a detailed code review addressing the following aspects:
-    1. Overall code quality (score out of 10)
-    2. Suggestions to make the code more concise
-    3. Suggestions to make the code faster
-    4. Suggestions to make the code more secure
-    5. Suggestions to make the code more efficient
-    6. Suggestions to make the code more readable
-    7. Suggestions to make the code more testable
-    
-    Format your response as a CodeReview object.
-    """
-    
-    return prompt
+    return [
+        ell.system(f"""
+You are an expert code reviewer. Please review the code you are given based on the provided coding standards.
+{REVIEW_ASPECTS}
+Format your response as a CodeReview object.
+
+Coding Standards:
+{coding_standards}
+"""),
+        ell.user(f"Code to review:\n{contents}")
+    ]
 
-@ell.complex(model="gpt-4o-2024-08-06", response_format=TestFileReview)
+@ell.complex(model=TEST_FILE_MODEL, response_format=TestFileReview)
 def is_test_file(language:str, contents: str):
     """Determine if a file is a test file based on its contents and language."""
     return [
@@ -43,4 +56,22 @@ the contents of a file. You need to determine if the file is a test file.
         ell.user(f"Analyze the following changes and provide feedback. Language: {language}, Contents: {contents}.")
     ]
 
-__all__ = ['code_reviewer', 'is_test_file']
+@ell.complex(model=CODE_REVIEW_MODEL, response_format=BatchCodeReview, temperature=0.1)
+def batch_code_reviewer(coding_standards: str, files: List[Tuple[str, str]]):
+    """
+    Perform a code review of several small files in one request. files is a list of (file_path, contents) pairs.
+    """
+    sections = "\n".join(f"File: {file_path}\n{contents}\n" for file_path, contents in files)
+    return [
+        ell.system(f"""
+You are an expert code reviewer. Please review each of the files you are given independently based on the provided coding standards.
+For every file:{REVIEW_ASPECTS}
+Format your response as a BatchCodeReview object with exactly one review per file, using each file path exactly as given.
+
+Coding Standards:
+{coding_standards}
+"""),
+        ell.user(f"Files to review:\n{sections}")
+    ]
+
+__all__ = ['code_reviewer', 'is_test_file', 'batch_code_reviewer']
@@ -0,0 +1,50 @@
+import re
+from typing import List
+from models.code_review import CodeReview
+from models.comment import Comment
+
+MAX_LINE_LENGTH = 120
+
+# statements left behind from debugging sessions
+DEBUG_STATEMENT_PATTERN = re.compile(
+    r'\b(console\.log|debugger|pdb\.set_trace|breakpoint\(\)|binding\.pry|var_dump|dd\(|System\.out\.println|fmt\.Println|println!|dbg!)'
+)
+TODO_PATTERN = re.compile(r'\b(TODO|FIXME|XXX|HACK)\b')
+
+
+def added_lines(diff: str) -> List[str]:
+    return [line[1:] for line in diff.splitlines() if line.startswith('+') and not line.startswith('+++ ')]
+
+
+def lint_comment(findings: List[str], severity: str) -> Comment:
+    if not findings:
+        return Comment(comment="", severity="")
+    return Comment(comment=' '.join(findings), severity=severity)
+
+
+def lint_review(contents: str) -> CodeReview:
+    """
+    Review a trivial diff with deterministic local checks instead of a model: debug statements, markers of unfinished
+    work, overlong lines and trailing whitespace in the added lines.
+    """
+    lines = added_lines(contents)
+    debug = sum(1 for line in lines if DEBUG_STATEMENT_PATTERN.search(line))
+    todos = sum(1 for line in lines if TODO_PATTERN.search(line))
+    long_lines = sum(1 for line in lines if len(line) > MAX_LINE_LENGTH)
+    trailing = sum(1 for line in lines if line != line.rstrip())
+
+    readable = [f"Remove the {debug} debug statement(s) added."] if debug else []
+    if long_lines:
+        readable.append(f"Wrap the {long_lines} added line(s) longer than {MAX_LINE_LENGTH} characters.")
+    if todos:
+        readable.append(f"Resolve or track in an issue the {todos} TODO/FIXME marker(s) added.")
+    concise = [f"Remove trailing whitespace from {trailing} added line(s)."] if trailing else []
+    return CodeReview(
+        code_review_score=max(5, 10 - 2 * debug - todos - (1 if long_lines else 0) - (1 if trailing else 0)),
+        make_it_succint=lint_comment(concise, "MAY"),
+        make_it_faster=lint_comment([], ""),
+        make_it_more_secure=lint_comment([], ""),
+        make_it_more_efficient=lint_comment([], ""),
+        make_it_more_readable=lint_comment(readable, "SHOULD" if debug else "MAY"),
+        make_it_more_testable=lint_comment([], ""),
+    )
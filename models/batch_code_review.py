@@ -0,0 +1,10 @@
+from typing import List
+from pydantic import BaseModel, Field
+from models.code_review import CodeReview
+
+class FileCodeReview(BaseModel):
+    file_path: str = Field(description="The path of the reviewed file, exactly as given in the request.")
+    review: CodeReview = Field(description="The code review of the file.")
+
+class BatchCodeReview(BaseModel):
+    reviews: List[FileCodeReview] = Field(description="One code review per file in the request, in the same order.")
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+
+class Change(BaseModel):
+    new_path: str = Field(description="The path of the file after the change.")
+    old_path: str = Field(description="The path of the file before the change. Differs from new_path for renames.")
+    diff: str = Field(description="The unified diff of the file. Empty for binary files.")
+    status: str = Field(description="One of added, modified, deleted or renamed.")
+    additions: int = Field(description="The number of added lines.")
+    deletions: int = Field(description="The number of deleted lines.")
+
+    @property
+    def renamed(self) -> bool:
+        return self.status == 'renamed'
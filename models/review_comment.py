@@ -0,0 +1,9 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class ReviewComment(BaseModel):
+    file_path: str = Field(description="The path of the file the finding is about.")
+    old_path: str = Field(description="The path of the file before the change. Differs from file_path for renames.")
+    line: Optional[int] = Field(description="The line of the new file the comment is anchored to, or None when the diff adds no lines.")
+    body: str = Field(description="The comment text, ending with its deduplication marker.")
+    marker: str = Field(description="Hash of the finding that identifies it across runs.")
@@ -0,0 +1,55 @@
+import json
+import sys
+import threading
+from typing import Dict, List, Optional, TextIO, Tuple
+from findings_store import FindingsStore
+from models.code_review import CodeReview
+from models.test_file_review import TestFileReview
+from output.review_output import ReviewOutput
+
+
+class JsonLinesOutput(ReviewOutput):
+    """
+    Writes one JSON object per line as each part of the analysis completes: merge_request, file_list, message,
+    file_review and summary events. Every line is flushed when written, so consumers can follow the stream and
+    memory stays flat however many files or merge requests are reviewed.
+    """
+    collects_summaries = False
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.mr_url = ''
+
+    def write(self, event: Dict) -> None:
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        with self.lock:
+            stream = self.stream or sys.stdout
+            stream.write(line)
+            stream.flush()
+
+    def merge_request(self, mr_url: str) -> None:
+        # merge requests are rendered one at a time, so every event until the next one belongs to this one
+        self.mr_url = mr_url
+        self.write({'type': 'merge_request', 'merge_request': mr_url})
+
+    def file_list(self, category: str, files: List[Tuple[str, str]]) -> None:
+        self.write({'type': 'file_list', 'merge_request': self.mr_url, 'category': category,
+                    'files': [{'file': file_path, 'detail': detail} for file_path, detail in files]})
+
+    def message(self, text: str) -> None:
+        self.write({'type': 'message', 'merge_request': self.mr_url, 'text': text.strip()})
+
+    def file_review(self, file_path: str, language: str, test_review: TestFileReview, code_review: CodeReview) -> None:
+        self.write({'type': 'file_review', 'merge_request': self.mr_url, 'file': file_path, 'language': language,
+                    'test_review': test_review.model_dump(), 'code_review': code_review.model_dump()})
+
+    def summary(self, final_score: float, findings: FindingsStore, missing_tests: bool) -> None:
+        self.write({'type': 'summary', 'merge_request': self.mr_url, 'final_score': final_score,
+                    'must_findings': findings.count('MUST'), 'missing_tests': missing_tests,
+                    'findings_by_severity': {severity: count for (severity,), count in findings.count_by('severity').items()},
+                    'findings_by_category': {category: count for (category,), count in findings.count_by('category').items()}})
+
+    def close(self) -> None:
+        if self.stream is not None:
+            self.stream.close()
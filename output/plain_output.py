@@ -0,0 +1,59 @@
+import contextlib
+import sys
+import threading
+from typing import Iterator, List, Optional, TextIO, Tuple
+from findings_store import FindingsStore
+from models.code_review import CodeReview
+from models.test_file_review import TestFileReview
+from output.review_output import COMMENT_LABELS, ReviewOutput
+
+
+class PlainOutput(ReviewOutput):
+    """
+    Writes the analysis as plain lines, for CI logs and other non-terminal output. No tables, colors or live updates.
+    """
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def write(self, lines: List[str]) -> None:
+        # lines of one file stay together when several merge requests are written at once
+        with self.lock:
+            (self.stream or sys.stdout).write(''.join(f"{line}\n" for line in lines))
+
+    def merge_request(self, mr_url: str) -> None:
+        self.write([f"Merge Request Analysis for {mr_url}:"])
+
+    def file_list(self, category: str, files: List[Tuple[str, str]]) -> None:
+        lines = [f"\n{category.capitalize()}:"]
+        for file_path, reason in files:
+            lines.append(f"  - {file_path} ({reason})" if category == 'skipped' else f"  - {file_path}")
+        self.write(lines)
+
+    def message(self, text: str) -> None:
+        self.write([text])
+
+    def file_review(self, file_path: str, language: str, test_review: TestFileReview, code_review: CodeReview) -> None:
+        lines = [f"  - {file_path} (Language: {language})", f"    Code Review Score: {code_review.code_review_score}/10"]
+        if test_review.is_test_file and test_review.are_there_missing_test_scenarios.comment != "":
+            scenarios = test_review.are_there_missing_test_scenarios
+            lines.append(f"    [{scenarios.severity}] Review of Test: {scenarios.comment}")
+        for name, label in COMMENT_LABELS.items():
+            comment = getattr(code_review, name)
+            if comment and comment.comment:
+                lines.append(f"    [{comment.severity}] {label}: {comment.comment}")
+        self.write(lines)
+
+    def summary(self, final_score: float, findings: FindingsStore, missing_tests: bool) -> None:
+        lines = ["CRITICAL: No test files detected."] if missing_tests else []
+        lines.append(f"Final Score: {final_score}/10")
+        if findings.count('MUST'):
+            lines.append("Summary of MUST Findings:")
+            for file_path, category, _, comment in findings.findings('MUST'):
+                lines.append(f"  [{category}] {file_path}: {comment}")
+        self.write(lines)
+
+    @contextlib.contextmanager
+    def fetching(self, mr_url: str) -> Iterator[None]:
+        self.write([f"Fetching changes for {mr_url}"])
+        yield
@@ -0,0 +1,102 @@
+import contextlib
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Tuple
+from models.code_review import CodeReview
+from models.test_file_review import TestFileReview
+
+if TYPE_CHECKING:
+    from findings_store import FindingsStore
+
+# display labels of the CodeReview comment fields, in display order
+COMMENT_LABELS = {
+    'make_it_succint': "Make it concise",
+    'make_it_faster': "Make it faster",
+    'make_it_more_secure': "Make it more secure",
+    'make_it_more_efficient': "Make it more efficient",
+    'make_it_more_readable': "Make it more readable",
+    'make_it_more_testable': "Make it more testable",
+}
+
+
+class ReviewProgress:
+    """
+    The status of every file review of a merge request: queued, reviewing, done or failed.
+    Workers update it while the output shows it.
+    """
+    def __init__(self):
+        self.statuses: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def set(self, file_paths: List[str], status: str) -> None:
+        with self.lock:
+            for file_path in file_paths:
+                self.statuses[file_path] = status
+
+    def track(self, file_paths: List[str], fn: Callable) -> Callable:
+        """
+        Wrap a review function so the files it reviews move to reviewing when a worker starts it and to done or failed after.
+        """
+        self.set(file_paths, 'queued')
+
+        def tracked(*args):
+            self.set(file_paths, 'reviewing')
+            try:
+                result = fn(*args)
+            except BaseException:
+                self.set(file_paths, 'failed')
+                raise
+            self.set(file_paths, 'done')
+            return result
+        return tracked
+
+    def snapshot(self) -> List[Tuple[str, str]]:
+        with self.lock:
+            return list(self.statuses.items())
+
+
+class ReviewOutput(ABC):
+    """
+    Where a merge request's analysis is written as it completes.
+    """
+    # whether summary() lists the MUST findings; streaming outputs write findings with each file, so their text is not kept
+    collects_summaries = True
+
+    @abstractmethod
+    def merge_request(self, mr_url: str) -> None:
+        """Start the analysis of a merge request."""
+        pass
+
+    @abstractmethod
+    def file_list(self, category: str, files: List[Tuple[str, str]]) -> None:
+        """List the (file_path, language or skip reason) files of a category that are not reviewed."""
+        pass
+
+    @abstractmethod
+    def message(self, text: str) -> None:
+        """Write a warning or status line."""
+        pass
+
+    @abstractmethod
+    def file_review(self, file_path: str, language: str, test_review: TestFileReview, code_review: CodeReview) -> None:
+        """Write a completed file review."""
+        pass
+
+    @abstractmethod
+    def summary(self, final_score: float, findings: 'FindingsStore', missing_tests: bool) -> None:
+        """Write the final score and the MUST findings of the merge request; finding comments are empty unless collects_summaries."""
+        pass
+
+    def close(self) -> None:
+        """Finish the output once the run is over."""
+        pass
+
+    @contextlib.contextmanager
+    def fetching(self, mr_url: str) -> Iterator[None]:
+        """Show that a merge request's changes are being fetched."""
+        yield
+
+    @contextlib.contextmanager
+    def progress(self, progress: ReviewProgress) -> Iterator[None]:
+        """Show the file review statuses while the enclosed block waits for them."""
+        yield
@@ -0,0 +1,130 @@
+import contextlib
+import sys
+from typing import Iterator, List, TextIO, Tuple
+from rich.console import Console, Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+from rich import box
+from models.code_review import CodeReview
+from models.test_file_review import TestFileReview
+from findings_store import FindingsStore
+from output.review_output import COMMENT_LABELS, ReviewOutput, ReviewProgress
+
+# the console every rich table of a run is printed to
+CONSOLE = Console()
+
+def console_for(stream: TextIO) -> Console:
+    """
+    Return the console to print tables to stream with: the run's console for stdout, another one for stderr.
+    """
+    return CONSOLE if stream is sys.stdout else Console(file=stream)
+
+# at most this many in-flight files are listed by name in the live progress view
+PROGRESS_ROWS = 10
+
+
+def print_review_details(file_path: str, language: str, review: CodeReview, console: Console = CONSOLE) -> None:
+    """
+    Print the details of a code review for a specific file.
+
+    Args:
+    file_path (str): The path of the file being reviewed.
+    language (str): The programming language of the file.
+    review (CodeReview): The CodeReview object containing the review details.
+    console (Console): The console to print to.
+    """
+    console.out(f"  - {file_path} (Language: {language})", highlight=False)
+    console.out(f"    Code Review Score: {review.code_review_score}/10", highlight=False)
+    table_header = f"Score: {review.code_review_score}/10: {file_path}"
+
+    my_table = Table(title=table_header)
+    my_table.add_column("Category", justify="left", style="cyan", no_wrap=True)
+    my_table.add_column("Severity", justify="left", style="red", no_wrap=True)
+    my_table.add_column("Recommendation", style="green", no_wrap=False)
+
+    for name, label in COMMENT_LABELS.items():
+        comment = getattr(review, name)
+        if comment and comment.comment:
+            my_table.add_row(label, comment.severity, comment.comment)
+
+    if my_table.row_count:
+        console.print(my_table)
+
+def print_test_review_details(file_path: str, language: str, review: TestFileReview, console: Console = CONSOLE) -> None:
+    """
+    Print the missing test scenarios found in a test file.
+    """
+    if review.are_there_missing_test_scenarios.comment != "":
+        table_header = f"Test File Review for {file_path} (Language: {language})"
+        my_table = Table(title=table_header)
+        my_table.add_column("Category", justify="left", style="red", no_wrap=True)
+        my_table.add_column("Severity", justify="center", style="red", no_wrap=True)
+        my_table.add_column("Recommendation", style="green", no_wrap=False)
+        my_table.add_row("Review of Test", review.are_there_missing_test_scenarios.severity, review.are_there_missing_test_scenarios.comment)
+        console.print(my_table)
+
+
+class RichOutput(ReviewOutput):
+    """
+    Writes the analysis as rich tables to one shared console, with a live view of the file review statuses while
+    reviews run. Each file is printed above the live view as soon as its review completes.
+    """
+    def __init__(self, console: Console = CONSOLE):
+        self.console = console
+
+    def merge_request(self, mr_url: str) -> None:
+        self.console.out(f"Merge Request Analysis for {mr_url}:", highlight=False)
+
+    def file_list(self, category: str, files: List[Tuple[str, str]]) -> None:
+        self.console.out(f"\n{category.capitalize()}:", highlight=False)
+        for file_path, reason in files:
+            self.console.out(f"  - {file_path} ({reason})" if category == 'skipped' else f"  - {file_path}", highlight=False)
+
+    def message(self, text: str) -> None:
+        self.console.out(text, highlight=False)
+
+    def file_review(self, file_path: str, language: str, test_review: TestFileReview, code_review: CodeReview) -> None:
+        if test_review.is_test_file:
+            print_test_review_details(file_path, language, test_review, self.console)
+        print_review_details(file_path, language, code_review, self.console)
+
+    def summary(self, final_score: float, findings: FindingsStore, missing_tests: bool) -> None:
+        if missing_tests:
+            self.console.out("CRITICAL: No test files detected.", highlight=False)
+        self.console.out(f"Final Score: {final_score}/10", highlight=False)
+        if findings.count('MUST'):
+            my_table = Table(title="Summary of MUST Findings", show_lines=True, box=box.MINIMAL_DOUBLE_HEAD)
+            my_table.add_column("Category", justify="left", style="red", no_wrap=True)
+            my_table.add_column("Severity", justify="center", style="red", no_wrap=True)
+            my_table.add_column("File", style="white", no_wrap=False)
+            my_table.add_column("Recommendation", style="green", no_wrap=False)
+            for file_path, category, severity, comment in findings.findings('MUST'):
+                my_table.add_row(category, severity, file_path, comment)
+            self.console.print(my_table)
+
+    @contextlib.contextmanager
+    def fetching(self, mr_url: str) -> Iterator[None]:
+        with self.console.status(f"Fetching changes for {mr_url}"):
+            yield
+
+    @contextlib.contextmanager
+    def progress(self, progress: ReviewProgress) -> Iterator[None]:
+        with Live(console=self.console, transient=True, refresh_per_second=4, get_renderable=lambda: self.progress_view(progress)):
+            yield
+
+    def progress_view(self, progress: ReviewProgress) -> Group:
+        """
+        Render the status counts and the files currently being reviewed.
+        """
+        statuses = progress.snapshot()
+        counts = {status: 0 for status in ('queued', 'reviewing', 'done', 'failed')}
+        for _, status in statuses:
+            counts[status] += 1
+        line = Text(f"Reviewed {counts['done'] + counts['failed']}/{len(statuses)} files: " + ', '.join(f"{count} {status}" for status, count in counts.items()))
+        my_table = Table(box=None, show_header=False)
+        my_table.add_column("Status", style="cyan", no_wrap=True)
+        my_table.add_column("File", style="white", no_wrap=True)
+        for file_path, status in [(file_path, status) for file_path, status in statuses if status == 'reviewing'][:PROGRESS_ROWS]:
+            my_table.add_row(status, file_path)
+        return Group(line, my_table)
@@ -0,0 +1,106 @@
+import json
+import sys
+import threading
+from typing import Dict, List, Optional, TextIO, Tuple
+from findings_store import FindingsStore
+from models.code_review import CodeReview
+from models.comment import Comment
+from models.test_file_review import TestFileReview
+from output.review_output import COMMENT_LABELS, ReviewOutput
+
+SARIF_VERSION = '2.1.0'
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+TOOL_NAME = 'gitlab-mr-analyzer'
+
+# rule id of the test review's missing scenarios, reported alongside the CodeReview comment fields
+MISSING_TEST_SCENARIOS = 'are_there_missing_test_scenarios'
+
+SEVERITY_LEVELS = {'MUST': 'error', 'SHOULD': 'warning', 'MAY': 'note'}
+
+
+def sarif_rules() -> List[Dict]:
+    rules = [{'id': MISSING_TEST_SCENARIOS, 'shortDescription': {'text': "Review of Test"}}]
+    rules.extend({'id': name, 'shortDescription': {'text': label}} for name, label in COMMENT_LABELS.items())
+    return rules
+
+
+def sarif_result(rule_id: str, file_path: str, comment: Comment) -> Dict:
+    return {
+        'ruleId': rule_id,
+        'level': SEVERITY_LEVELS.get(comment.severity.upper(), 'note'),
+        'message': {'text': comment.comment},
+        'locations': [{'physicalLocation': {'artifactLocation': {'uri': file_path}}}],
+    }
+
+
+class SarifOutput(ReviewOutput):
+    """
+    Writes a SARIF 2.1.0 log with one run per merge request and one result per review comment.
+    The document is written piece by piece as file reviews complete instead of being built in memory,
+    so it is only valid JSON once close() has ended it.
+    """
+    collects_summaries = False
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.started = False
+        self.run_open = False
+        self.results_written = 0
+
+    def write(self, text: str) -> None:
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+    def end_run(self, properties: Optional[Dict] = None) -> None:
+        # called with the lock held
+        if self.run_open:
+            self.write('\n]' + (f', "properties": {json.dumps(properties)}' if properties else '') + '}')
+            self.run_open = False
+
+    def merge_request(self, mr_url: str) -> None:
+        with self.lock:
+            self.end_run()
+            if self.started:
+                self.write(',\n')
+            else:
+                self.write(f'{{"version": "{SARIF_VERSION}", "$schema": "{SARIF_SCHEMA}", "runs": [\n')
+                self.started = True
+            tool = {'driver': {'name': TOOL_NAME, 'rules': sarif_rules()}}
+            self.write(f'{{"tool": {json.dumps(tool)}, "automationDetails": {json.dumps({"id": mr_url})}, "results": [')
+            self.run_open = True
+            self.results_written = 0
+
+    def file_list(self, category: str, files: List[Tuple[str, str]]) -> None:
+        pass
+
+    def message(self, text: str) -> None:
+        pass
+
+    def file_review(self, file_path: str, language: str, test_review: TestFileReview, code_review: CodeReview) -> None:
+        results = []
+        scenarios = test_review.are_there_missing_test_scenarios
+        if test_review.is_test_file and scenarios.comment:
+            results.append(sarif_result(MISSING_TEST_SCENARIOS, file_path, scenarios))
+        for name in COMMENT_LABELS:
+            comment = getattr(code_review, name)
+            if comment and comment.comment:
+                results.append(sarif_result(name, file_path, comment))
+        with self.lock:
+            for result in results:
+                self.write((',\n' if self.results_written else '\n') + json.dumps(result, ensure_ascii=False))
+                self.results_written += 1
+
+    def summary(self, final_score: float, findings: FindingsStore, missing_tests: bool) -> None:
+        with self.lock:
+            self.end_run({'finalScore': final_score, 'mustFindings': findings.count('MUST'), 'missingTests': missing_tests})
+
+    def close(self) -> None:
+        with self.lock:
+            self.end_run()
+            if not self.started:
+                self.write(f'{{"version": "{SARIF_VERSION}", "$schema": "{SARIF_SCHEMA}", "runs": [')
+            self.write('\n]}\n')
+            if self.stream is not None:
+                self.stream.close()
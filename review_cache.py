@@ -0,0 +1,117 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Type, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar('T', bound=BaseModel)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'mr-analyzer', 'reviews.sqlite3')
+
+# a long-running process such as the review service evicts after this many new entries
+EVICT_EVERY_PUTS = 500
+
+
+def cache_key(*parts: str) -> str:
+    """
+    Build a content-addressed key from the model, prompt version, standards and diff that produced a review.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode('utf-8')
+        # length-prefix each part so ('ab', 'c') and ('a', 'bc') hash differently
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ReviewCache:
+    """
+    On-disk SQLite cache of parsed LLM review results with age- and size-based eviction on open, on close and every
+    EVICT_EVERY_PUTS new entries.
+    """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_age_days: float = 30, max_bytes: int = 256 * 1024 * 1024):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.puts = 0
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS reviews (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+        self.evict()
+
+    @classmethod
+    def from_env(cls) -> Optional['ReviewCache']:
+        """
+        Open the cache configured by REVIEW_CACHE_PATH, REVIEW_CACHE_MAX_AGE_DAYS and REVIEW_CACHE_MAX_MB.
+        Returns None when REVIEW_CACHE is set to off.
+        """
+        if os.environ.get('REVIEW_CACHE', 'on').lower() in ('off', '0', 'false'):
+            return None
+        return cls(
+            path=os.environ.get('REVIEW_CACHE_PATH', DEFAULT_CACHE_PATH),
+            max_age_days=float(os.environ.get('REVIEW_CACHE_MAX_AGE_DAYS', '30')),
+            max_bytes=int(float(os.environ.get('REVIEW_CACHE_MAX_MB', '256')) * 1024 * 1024),
+        )
+
+    def get(self, key: str, model: Type[T]) -> Optional[T]:
+        """
+        Return the cached review for key, or None on a miss or an entry that no longer parses.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT payload FROM reviews WHERE key = ? AND model = ?", (key, model.__name__)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE reviews SET used_at = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+        try:
+            return model.model_validate_json(row[0])
+        except ValueError:
+            return None
+
+    def put(self, key: str, review: BaseModel) -> None:
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO reviews (key, model, payload, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, type(review).__name__, review.model_dump_json(), now, now),
+            )
+            self.connection.commit()
+            self.puts += 1
+            due = self.puts % EVICT_EVERY_PUTS == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Drop entries older than the age limit, then the least recently used entries until the cache fits its size limit.
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM reviews WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+            total = self.connection.execute("SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM reviews").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self.connection.execute("SELECT key, LENGTH(payload) FROM reviews ORDER BY used_at").fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                self.connection.executemany("DELETE FROM reviews WHERE key = ?", stale)
+            self.connection.commit()
+
+    def close(self) -> None:
+        self.evict()
+        with self.lock:
+            self.connection.close()
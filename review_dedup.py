@@ -0,0 +1,249 @@
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple
+from standards_registry import CodingStandards
+from test_classifier import classify_test_file
+
+# MinHash signature length and its split into LSH bands: 8 bands of 8 rows pair up diffs of Jaccard similarity above ~0.77
+SIGNATURE_BINS = 64
+BANDS = 8
+ROWS = SIGNATURE_BINS // BANDS
+
+# diffs are compared as sets of overlapping runs of this many tokens
+SHINGLE_TOKENS = 5
+
+# diffs with fewer tokens only match exactly; a few changed tokens make up most of a small diff
+MIN_NEAR_TOKENS = 50
+
+# equivalence classes remembered across the merge requests of a run, oldest forgotten first
+MAX_INDEXED_CLASSES = 10000
+
+HUNK_LINE_NUMBERS = re.compile(r'^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@')
+WHITESPACE = re.compile(r'\s+')
+
+ReviewItem = Tuple[str, str, str]
+
+
+def normalize_diff(file_path: str, diff: str) -> str:
+    """
+    Reduce a diff to what its review depends on: no hunk line numbers, blank lines, whitespace runs or mentions of the
+    file's own path and name, which differ between copies of the same change.
+    """
+    lines = []
+    for line in diff.splitlines():
+        if line.startswith('\\'):
+            continue
+        if line.startswith('@@'):
+            lines.append(HUNK_LINE_NUMBERS.sub('@@', line).rstrip())
+            continue
+        body = WHITESPACE.sub(' ', line[1:]).strip()
+        if body:
+            lines.append(line[:1] + body)
+    normalized = '\n'.join(lines).replace(file_path, '<path>')
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    if len(stem) >= 3:
+        normalized = re.sub(rf'\b{re.escape(stem)}\b', '<name>', normalized)
+    return normalized
+
+
+def minhash(tokens: List[str]) -> Tuple[int, ...]:
+    """
+    One-permutation MinHash: each shingle hash lands in one of SIGNATURE_BINS bins, which keep their smallest value.
+    Empty bins borrow the next filled bin's value so sparse signatures still compare bin by bin.
+    """
+    empty = 1 << 32
+    bins = [empty] * SIGNATURE_BINS
+    for i in range(max(1, len(tokens) - SHINGLE_TOKENS + 1)):
+        shingle_hash = zlib.crc32(' '.join(tokens[i:i + SHINGLE_TOKENS]).encode('utf-8'))
+        index = shingle_hash % SIGNATURE_BINS
+        value = shingle_hash // SIGNATURE_BINS
+        if value < bins[index]:
+            bins[index] = value
+    filled = [value for value in bins if value != empty]
+    if not filled:
+        return tuple(bins)
+    for index in range(SIGNATURE_BINS - 1, -1, -1):
+        if bins[index] == empty:
+            bins[index] = bins[(index + 1) % SIGNATURE_BINS] if bins[(index + 1) % SIGNATURE_BINS] != empty else filled[0]
+    return tuple(bins)
+
+
+def similarity(signature: Tuple[int, ...], other: Tuple[int, ...]) -> float:
+    """
+    Estimate the Jaccard similarity of two diffs' shingle sets from their signatures.
+    """
+    return sum(1 for a, b in zip(signature, other) if a == b) / SIGNATURE_BINS
+
+
+class Sketch:
+    """
+    The fingerprints of one file's diff: an exact hash of the normalized diff and, for larger diffs, a MinHash signature.
+    Files are only compared within a group of the same language, coding standards and test-ness, since those shape the review.
+    """
+    def __init__(self, group: str, file_path: str, diff: str, near: bool):
+        normalized = normalize_diff(file_path, diff)
+        self.group = group
+        self.exact = hashlib.sha256(f"{group}\0{normalized}".encode('utf-8')).hexdigest()
+        tokens = normalized.split()
+        self.signature = minhash(tokens) if near and len(tokens) >= MIN_NEAR_TOKENS else None
+
+    def bands(self) -> List[Tuple[str, int, Tuple[int, ...]]]:
+        if self.signature is None:
+            return []
+        return [(self.group, band, self.signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class DedupPlan:
+    """
+    How a merge request's files split into leaders, which are reviewed, and duplicates, which share a leader's review.
+    Each leader's promise resolves to its review once it is submitted, for duplicates in this and later merge requests.
+    """
+    def __init__(self):
+        self.leaders: List[ReviewItem] = []
+        self.promises: Dict[str, Future] = {}
+        self.duplicates: List[Tuple[str, str, Future, str]] = []
+
+    def settle(self, reviews: Dict[str, Future]) -> None:
+        """
+        Resolve each leader's promise with its submitted review. Leaders left without one, because submitting stopped
+        part way, fail their promises so duplicates waiting on them do not block forever.
+        """
+        for file_path, promise in self.promises.items():
+            if file_path in reviews:
+                resolve(promise, reviews[file_path])
+            else:
+                promise.set_exception(RuntimeError(f"Review of {file_path} was not submitted"))
+
+
+class ReviewDeduplicator:
+    """
+    Index of the diffs reviewed in a run, so files whose diffs are identical or nearly identical after normalization
+    (mass renames, vendored copies, codemods, cherry-picks) are reviewed once and share the result, within and across
+    merge requests.
+    """
+    def __init__(self, near: bool = True, min_similarity: float = 0.9, max_classes: int = MAX_INDEXED_CLASSES):
+        self.near = near
+        self.min_similarity = min_similarity
+        self.max_classes = max_classes
+        # exact hash -> (leader path, promise, sketch)
+        self.classes: 'OrderedDict[str, Tuple[str, Future, Sketch]]' = OrderedDict()
+        self.band_index: Dict[Tuple[str, int, Tuple[int, ...]], Set[str]] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['ReviewDeduplicator']:
+        """
+        Configure deduplication from REVIEW_DEDUP (on, exact or off) and REVIEW_DEDUP_SIMILARITY. Returns None when off.
+        """
+        mode = os.environ.get('REVIEW_DEDUP', 'on').lower()
+        if mode in ('off', '0', 'false'):
+            return None
+        if mode not in ('on', '1', 'true', 'exact'):
+            raise ValueError(f"Unknown REVIEW_DEDUP: {mode}")
+        return cls(near=mode != 'exact', min_similarity=float(os.environ.get('REVIEW_DEDUP_SIMILARITY', '0.9')))
+
+    def match(self, sketch: Sketch) -> Optional[Tuple[str, Future, str]]:
+        # called with the lock held
+        if sketch.exact in self.classes:
+            leader_path, promise, _ = self.classes[sketch.exact]
+            return leader_path, promise, 'exact'
+        candidates: Set[str] = set()
+        for band in sketch.bands():
+            candidates.update(self.band_index.get(band, ()))
+        best = None
+        for candidate in candidates:
+            leader_path, promise, leader_sketch = self.classes[candidate]
+            score = similarity(sketch.signature, leader_sketch.signature)
+            if score >= self.min_similarity and (best is None or score > best[0]):
+                best = (score, leader_path, promise)
+        return (best[1], best[2], 'near') if best else None
+
+    def add(self, sketch: Sketch, file_path: str, promise: Future) -> None:
+        # called with the lock held
+        self.classes[sketch.exact] = (file_path, promise, sketch)
+        for band in sketch.bands():
+            self.band_index.setdefault(band, set()).add(sketch.exact)
+        while len(self.classes) > self.max_classes:
+            self.remove(next(iter(self.classes)))
+
+    def remove(self, exact: str) -> None:
+        # called with the lock held
+        _, _, sketch = self.classes.pop(exact)
+        for band in sketch.bands():
+            members = self.band_index.get(band)
+            if members is not None:
+                members.discard(exact)
+                if not members:
+                    del self.band_index[band]
+
+    def forget_failed(self, exact: str, promise: Future) -> None:
+        """
+        Drop a class whose leader's review failed, so later files with the same diff are reviewed rather than sharing the failure.
+        """
+        if not promise.cancelled() and promise.exception() is None:
+            return
+        with self.lock:
+            entry = self.classes.get(exact)
+            if entry is not None and entry[1] is promise:
+                self.remove(exact)
+
+    def plan(self, items: List[ReviewItem], standards: Dict[str, Optional[CodingStandards]]) -> DedupPlan:
+        """
+        Match every file against the diffs already indexed; files without a match become leaders of new classes.
+        """
+        plan = DedupPlan()
+        sketches = []
+        for file_path, language, contents in items:
+            group = f"{language}\0{standards[language].sha}\0{classify_test_file(file_path, language, contents)}"
+            sketches.append(Sketch(group, file_path, contents, self.near))
+        with self.lock:
+            for item, sketch in zip(items, sketches):
+                file_path = item[0]
+                found = self.match(sketch)
+                if found is None:
+                    promise = Future()
+                    self.add(sketch, file_path, promise)
+                    promise.add_done_callback(lambda done, exact=sketch.exact: self.forget_failed(exact, done))
+                    plan.leaders.append(item)
+                    plan.promises[file_path] = promise
+                else:
+                    leader_path, promise, kind = found
+                    plan.duplicates.append((file_path, leader_path, promise, kind))
+        return plan
+
+
+def resolve(promise: Future, future: Future) -> None:
+    """
+    Settle a leader's promise with the outcome of its submitted review.
+    """
+    def settle(done: Future) -> None:
+        # a cancelled review raises CancelledError here, which fails the promise too
+        try:
+            result = done.result()
+        except Exception as e:
+            promise.set_exception(e)
+        else:
+            promise.set_result(result)
+    future.add_done_callback(settle)
+
+
+def shared_review(promise: Future, leader_path: str, file_path: str) -> Future:
+    """
+    Return a future of a duplicate's review: the leader's review filed under the duplicate's path.
+    """
+    shared = Future()
+
+    def fan_out(done: Future) -> None:
+        try:
+            result = done.result()
+        except Exception as e:
+            shared.set_exception(e)
+        else:
+            shared.set_result({file_path: result[leader_path]})
+    promise.add_done_callback(fan_out)
+    return shared
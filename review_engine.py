@@ -0,0 +1,212 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+# HTTP status codes worth retrying: timeouts, conflicts, rate limits and transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Token bucket that caps how many requests per minute are sent to a single LLM provider.
+    """
+    def __init__(self, requests_per_minute: int):
+        self.capacity = max(1, requests_per_minute)
+        self.tokens = float(self.capacity)
+        self.refill_rate = self.capacity / 60.0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until a request slot is available.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.refill_rate
+            time.sleep(wait)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a provider whose circuit breaker is open.
+    """
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Decide whether an LLM call failure is a transient provider problem: a timeout, a lost connection, a rate limit or a server error.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, 'status_code', None) in RETRYABLE_STATUS_CODES:
+        return True
+    name = type(error).__name__
+    return 'RateLimit' in name or 'Timeout' in name or 'Connection' in name
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether an LLM call failure is worth another attempt: transient provider problems and errors that mark
+    themselves retryable, such as a response that could not be parsed.
+    """
+    return is_transient(error) or getattr(error, 'retryable', False)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Return the provider's Retry-After hint in seconds, if the error carries one.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after consecutive transient failures. Once the cooldown has passed one trial call is let
+    through: its success closes the circuit again, its failure keeps it open for another cooldown.
+    """
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Raise CircuitOpenError unless the provider may be called.
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if self.trial_running or time.monotonic() - self.opened_at < self.cooldown:
+                raise CircuitOpenError(f"Provider disabled for up to {self.cooldown:.0f}s after {self.failures} consecutive failures")
+            self.trial_running = True
+
+    def record(self, error: Optional[Exception]) -> None:
+        """
+        Record the outcome of a call: None on success, otherwise the error it failed with.
+        """
+        with self.lock:
+            self.trial_running = False
+            if error is None:
+                self.failures = 0
+                self.opened_at = None
+            elif is_transient(error):
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self.opened_at = time.monotonic()
+            elif self.opened_at is not None:
+                # the provider answered, so the trial call shows it is back
+                self.failures = 0
+                self.opened_at = None
+
+
+class ReviewEngine:
+    """
+    Runs LLM review calls on a bounded thread pool with per-provider rate limiting, retries and circuit breakers.
+    """
+    def __init__(self, max_workers: int = 8, requests_per_minute: int = 500, max_retries: int = 4, backoff_base: float = 1.0,
+                 circuit_failures: int = 5, circuit_cooldown: float = 30.0):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='review')
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.circuit_failures = circuit_failures
+        self.circuit_cooldown = circuit_cooldown
+        self.rate_limiters: Dict[str, RateLimiter] = {}
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.pending: Set[Future] = set()
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ReviewEngine':
+        """
+        Build an engine configured from REVIEW_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, LLM_MAX_RETRIES,
+        LLM_CIRCUIT_FAILURES and LLM_CIRCUIT_COOLDOWN.
+        """
+        return cls(
+            max_workers=int(os.environ.get('REVIEW_CONCURRENCY', '8')),
+            requests_per_minute=int(os.environ.get('LLM_REQUESTS_PER_MINUTE', '500')),
+            max_retries=int(os.environ.get('LLM_MAX_RETRIES', '4')),
+            circuit_failures=int(os.environ.get('LLM_CIRCUIT_FAILURES', '5')),
+            circuit_cooldown=float(os.environ.get('LLM_CIRCUIT_COOLDOWN', '30')),
+        )
+
+    def rate_limiter(self, provider: str) -> RateLimiter:
+        with self.lock:
+            if provider not in self.rate_limiters:
+                self.rate_limiters[provider] = RateLimiter(self.requests_per_minute)
+            return self.rate_limiters[provider]
+
+    def circuit_breaker(self, provider: str) -> CircuitBreaker:
+        with self.lock:
+            if provider not in self.circuit_breakers:
+                self.circuit_breakers[provider] = CircuitBreaker(self.circuit_failures, self.circuit_cooldown)
+            return self.circuit_breakers[provider]
+
+    def call(self, provider: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call fn once the provider's rate limit allows it, retrying retryable failures with jittered exponential backoff.
+        Fails fast with CircuitOpenError while the provider's circuit breaker is open.
+        """
+        limiter = self.rate_limiter(provider)
+        breaker = self.circuit_breaker(provider)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            limiter.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                breaker.record(e)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = retry_after(e) or self.backoff_base * (2 ** attempt)
+                with self.lock:
+                    self.retries += 1
+                time.sleep(delay + random.uniform(0, delay / 2))
+                attempt += 1
+            else:
+                breaker.record(None)
+                return result
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Schedule fn on the worker pool and return its future. Only unfinished futures are kept, for shutdown to cancel.
+        """
+        future = self.executor.submit(fn, *args, **kwargs)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self.finished)
+        return future
+
+    def finished(self, future: Future) -> None:
+        with self.lock:
+            self.pending.discard(future)
+
+    def shutdown(self) -> None:
+        """
+        Cancel reviews that have not started yet and wait for the running ones to finish.
+        """
+        with self.lock:
+            pending = list(self.pending)
+        for future in pending:
+            future.cancel()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,296 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Type, TypeVar
+from concurrent.futures import Future
+from pydantic import ValidationError
+from findings_store import FindingsStore
+from diff_chunker import chunk_diff, chunk_diff_hunks, estimate_tokens, hunk_keys, merge_parts, merge_reviews, select_uncovered_hunks
+from instrumentation import Tracer
+from llm.llm_backend import LARGE_MODEL, SMALL_MODEL, LLMBackend
+from local_lint import lint_review
+from models.code_review import CodeReview
+from models.comment import Comment
+from models.test_file_review import TestFileReview
+from output.plain_output import PlainOutput
+from output.review_output import ReviewOutput
+from review_cache import ReviewCache, cache_key
+from review_dedup import ReviewDeduplicator
+from review_engine import ReviewEngine, is_retryable
+from review_router import LINT, ReviewRouter
+from review_state import ReviewPart, ReviewState, StoredReview
+from standards_registry import CodingStandards, StandardsRegistry
+from test_classifier import ClassifierStats, classify_test_file
+
+T = TypeVar('T')
+
+# tokens reserved for the code_reviewer instructions that wrap the standards and the diff
+PROMPT_OVERHEAD_TOKENS = 500
+
+# (file_path, language, contents) of a file waiting to be reviewed
+ReviewItem = Tuple[str, str, str]
+
+class ReviewContext:
+    """
+    The services shared by every review in a run: the LLM backend, the worker engine, the cache, the classifier stats,
+    the tracer, the coding standards, the incremental review state and the output results are written to.
+    """
+    def __init__(self, backend: LLMBackend, engine: ReviewEngine, cache: Optional[ReviewCache], classifier_stats: ClassifierStats, tracer: Tracer, standards: StandardsRegistry, state: Optional[ReviewState] = None, output: Optional[ReviewOutput] = None, publish: bool = False,
+                 dedup: Optional[ReviewDeduplicator] = None, router: Optional[ReviewRouter] = None,
+                 findings: Optional[FindingsStore] = None):
+        self.backend = backend
+        self.engine = engine
+        self.cache = cache
+        self.classifier_stats = classifier_stats
+        self.tracer = tracer
+        self.standards = standards
+        self.state = state
+        self.output = output if output is not None else PlainOutput()
+        # post findings back to the merge request after rendering
+        self.publish = publish
+        self.dedup = dedup
+        self.router = router
+        # every merge request's results, for the run's findings report
+        self.findings = findings
+        # cache key -> future of the call in flight, so identical concurrent requests are sent once
+        self.in_flight: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def close(self) -> None:
+        """
+        Stop the worker engine, flush the cache, review state and backend logs and finish the output.
+        """
+        self.engine.shutdown()
+        self.backend.close()
+        self.output.close()
+        if self.cache:
+            self.cache.close()
+        if self.state:
+            self.state.close()
+
+    def key(self, kind: str, *parts: str, tier: str = LARGE_MODEL) -> str:
+        return cache_key(kind, self.backend.cache_identity(kind, tier), *parts)
+
+    def review_identity(self, coding_standards: CodingStandards) -> str:
+        """
+        Identify what a file's review is produced with: the models and prompt versions of every call kind and tier, whether
+        reviews are routed and the coding standards. Stored reviews are only reused by runs with the same identity.
+        """
+        identities = [self.backend.cache_identity(kind, tier) for kind in ('is_test_file', 'code_reviewer', 'batch_code_reviewer') for tier in (LARGE_MODEL, SMALL_MODEL)]
+        return cache_key('review_state', *identities, 'routed' if self.router else 'large', coding_standards.sha)
+
+    def cached(self, key: str, model: Type[T]) -> Optional[T]:
+        """
+        Look up a cached review, counting hits and misses.
+        """
+        if self.cache is None:
+            return None
+        review = self.cache.get(key, model)
+        self.tracer.count('cache_hits' if review is not None else 'cache_misses')
+        return review
+
+    def call(self, kind: str, file_path: str, fn: Callable, *args):
+        """
+        Call the backend through the engine inside a span, recording estimated token usage for the file.
+        """
+        with self.tracer.span(kind, file_path):
+            result = self.engine.call(self.backend.provider, fn, *args)
+        self.tracer.count('llm_calls')
+        prompt_tokens = sum(estimate_tokens(str(arg)) for arg in args)
+        self.tracer.add_tokens(file_path, prompt_tokens, estimate_tokens(result.model_dump_json()))
+        return result
+
+def cached_call(context: ReviewContext, kind: str, key: str, file_path: str, model: Type[T], fn: Callable, *args: str) -> T:
+    """
+    Return the cached review under key, or call the backend and cache its result.
+    A call identical to one already in flight waits for that call's result instead of being sent again.
+    """
+    review = context.cached(key, model)
+    if review is not None:
+        return review
+    with context.lock:
+        shared = context.in_flight.get(key)
+        leader = shared is None
+        if leader:
+            shared = context.in_flight[key] = Future()
+    if not leader:
+        context.tracer.count('coalesced_calls')
+        return shared.result()
+    try:
+        review = context.call(kind, file_path, fn, *args)
+        if context.cache:
+            context.cache.put(key, review)
+        shared.set_result(review)
+        return review
+    except Exception as e:
+        shared.set_exception(e)
+        raise
+    finally:
+        with context.lock:
+            del context.in_flight[key]
+
+def review_test_file(context: ReviewContext, file_path: str, language: str, contents: str, tier: str = LARGE_MODEL) -> TestFileReview:
+    """
+    Decide whether a file is a test and review its missing test scenarios.
+    Files the local classifier rules out skip the is_test_file call; tests still go to the LLM for a scenario review.
+    Files of the LINT tier get no LLM call at all, so one the classifier cannot decide is treated as not a test.
+    """
+    is_test = classify_test_file(file_path, language, contents)
+    context.classifier_stats.record(is_test)
+    if is_test is None and tier == LINT:
+        context.classifier_stats.record_lint_skip()
+        is_test = False
+    if is_test is False:
+        return TestFileReview(is_test_file=False, review_score=0, are_there_missing_test_scenarios=Comment(comment="", severity=""))
+
+    # the first chunk is enough to tell whether a file is a test
+    sample = chunk_diff(contents, diff_budget(None))[0]
+    key = context.key('is_test_file', language, sample)
+    return cached_call(context, 'is_test_file', key, file_path, TestFileReview, context.backend.test_file_review, language, sample)
+
+def diff_budget(coding_standards: Optional[CodingStandards]) -> int:
+    """
+    Return how many diff tokens fit in a code review prompt next to the coding standards.
+    """
+    max_prompt_tokens = int(os.environ.get('REVIEW_MAX_PROMPT_TOKENS', '12000'))
+    return max(1000, max_prompt_tokens - (coding_standards.tokens if coding_standards else 0) - PROMPT_OVERHEAD_TOKENS)
+
+def review_code(context: ReviewContext, file_path: str, contents: str, coding_standards: CodingStandards, tier: str = LARGE_MODEL, parts: Optional[List[ReviewPart]] = None) -> CodeReview:
+    """
+    Review a file's diff with the model of its routing tier, or the local lint pass, reusing cached results for unchanged diffs.
+    Diffs too large for one prompt are reviewed hunk by hunk in token-budgeted chunks and merged back into one review.
+    When parts is given, each chunk's review is appended to it with the keys of the hunks the chunk covers.
+    """
+    if tier == LINT:
+        with context.tracer.span('local_lint', file_path):
+            review = lint_review(contents)
+        if parts is not None:
+            parts.append((hunk_keys(contents), review))
+        return review
+    chunks = chunk_diff_hunks(contents, diff_budget(coding_standards))
+    chunk_reviews = []
+    for chunk, keys in chunks:
+        key = context.key('code_reviewer', coding_standards.sha, chunk, tier=tier)
+        chunk_reviews.append(cached_call(context, 'code_reviewer', key, file_path, CodeReview, context.backend.code_review, coding_standards.text, chunk, tier))
+        if parts is not None:
+            parts.append((keys, chunk_reviews[-1]))
+    return merge_reviews(chunk_reviews, [estimate_tokens(chunk) for chunk, _ in chunks])
+
+def review_file(context: ReviewContext, file_path: str, language: str, contents: str, coding_standards: CodingStandards, tier: str = LARGE_MODEL, parts: Optional[List[ReviewPart]] = None) -> Dict[str, Tuple[TestFileReview, CodeReview]]:
+    """
+    Run the test-file check and the code review for a single file, collecting the parts of its review into parts if given.
+    """
+    test_review = review_test_file(context, file_path, language, contents, tier)
+    return {file_path: (test_review, review_code(context, file_path, contents, coding_standards, tier, parts))}
+
+def review_batch(context: ReviewContext, items: List[ReviewItem], coding_standards: CodingStandards) -> Dict[str, Tuple[TestFileReview, CodeReview]]:
+    """
+    Review several small files of the same language with one batch_code_reviewer call.
+    Files missing from the batch response, or every file when the batch fails, fall back to per-file reviews.
+    """
+    code_reviews: Dict[str, CodeReview] = {}
+    keys = {file_path: context.key('batch_code_reviewer', coding_standards.sha, contents) for file_path, _, contents in items}
+    pending = []
+    for file_path, language, contents in items:
+        review = context.cached(keys[file_path], CodeReview)
+        if review is None:
+            pending.append((file_path, contents))
+        else:
+            code_reviews[file_path] = review
+
+    if len(pending) > 1:
+        try:
+            batch_label = ', '.join(file_path for file_path, _ in pending)
+            batch = context.call('batch_code_reviewer', batch_label, context.backend.batch_code_review, coding_standards.text, pending)
+            for file_review in batch.reviews:
+                if file_review.file_path in keys and file_review.file_path not in code_reviews:
+                    code_reviews[file_review.file_path] = file_review.review
+                    if context.cache:
+                        context.cache.put(keys[file_review.file_path], file_review.review)
+        except Exception as e:
+            # a batch that cannot be parsed, or that kept failing after its retries, is retried file by file below
+            if not isinstance(e, (ValidationError, json.JSONDecodeError)) and not is_retryable(e):
+                raise
+            context.tracer.count('batch_fallbacks')
+
+    results = {}
+    for file_path, language, contents in items:
+        if file_path not in code_reviews:
+            code_reviews[file_path] = review_code(context, file_path, contents, coding_standards)
+        test_review = review_test_file(context, file_path, language, contents)
+        results[file_path] = (test_review, code_reviews[file_path])
+    return results
+
+def review_incremental(context: ReviewContext, file_path: str, diff: str, uncovered_diff: str, coding_standards: CodingStandards, test_review: TestFileReview, parts: List[ReviewPart], tier: str = LARGE_MODEL) -> Dict[str, Tuple[TestFileReview, CodeReview]]:
+    """
+    Review the hunks of a file that its kept review parts do not cover and merge that review with theirs, weighting each
+    by the size of the hunks it covers. The new parts are appended to parts, which then cover every hunk of the diff.
+    """
+    review_code(context, file_path, uncovered_diff, coding_standards, tier, parts)
+    return {file_path: (test_review, merge_parts(parts, diff))}
+
+def completed(result) -> Future:
+    """
+    Wrap an already known review result in a finished future.
+    """
+    future = Future()
+    future.set_result(result)
+    return future
+
+def succeeded(future: Future) -> bool:
+    """
+    Tell whether a review future finished with a result rather than an error or a cancellation.
+    """
+    return future.done() and not future.cancelled() and future.exception() is None
+
+def plan_incremental(items: List[ReviewItem], prior_reviews: Dict[str, StoredReview], identities: Dict[str, str]) -> Tuple[List[Tuple[ReviewItem, str, TestFileReview, List[ReviewPart]]], List[ReviewItem]]:
+    """
+    Match each file's hunks against the parts of its stored review made with the identity it is reviewed with now.
+    A part whose hunks are all still in the diff is kept; a part that covered a hunk which has changed or gone since is
+    dropped, and its other hunks are reviewed again. Returns (item, diff of the hunks left to review, prior test review,
+    kept parts) for files with kept parts, where the diff is empty when nothing is left, and the files that need a full review.
+    """
+    incremental = []
+    full = []
+    for item in items:
+        file_path, _, contents = item
+        prior = prior_reviews.get(file_path)
+        keys = set(hunk_keys(contents))
+        if prior is None or prior[0] != identities[file_path] or not keys:
+            full.append(item)
+            continue
+        _, test_review, parts = prior
+        kept = [part for part in parts if part[0] and keys.issuperset(part[0])]
+        if not kept:
+            full.append(item)
+            continue
+        covered = {key for part_keys, _ in kept for key in part_keys}
+        incremental.append((item, select_uncovered_hunks(contents, covered), test_review, kept))
+    return incremental, full
+
+def plan_batches(items: List[ReviewItem], max_file_tokens: int, max_batch_tokens: int) -> Tuple[List[List[ReviewItem]], List[ReviewItem]]:
+    """
+    Group files whose diffs fit in max_file_tokens into same-language batches bounded by max_batch_tokens.
+    Returns the batches and the files that are reviewed on their own.
+    """
+    batches: List[List[ReviewItem]] = []
+    singles: List[ReviewItem] = []
+    open_batches: Dict[str, Tuple[List[ReviewItem], int]] = {}
+    for item in items:
+        _, language, contents = item
+        tokens = estimate_tokens(contents)
+        if tokens > max_file_tokens:
+            singles.append(item)
+            continue
+        batch, used = open_batches.get(language, ([], 0))
+        if batch and used + tokens > max_batch_tokens:
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(item)
+        open_batches[language] = (batch, used + tokens)
+    for batch, _ in open_batches.values():
+        if len(batch) > 1:
+            batches.append(batch)
+        else:
+            singles.extend(batch)
+    return batches, singles
@@ -0,0 +1,116 @@
+import hashlib
+import re
+from typing import List, Optional, Set
+from diff_chunker import HUNK_HEADER
+from models.code_review import CodeReview
+from models.review_comment import ReviewComment
+from models.test_file_review import TestFileReview
+from output.review_output import COMMENT_LABELS
+from vcs.change_set import ChangeSet
+
+# findings at these severities are posted to the merge request; MAY findings stay in the local output
+PUBLISHED_SEVERITIES = ('MUST', 'SHOULD')
+
+# hidden in every posted comment so later runs can tell which findings are already on the merge request
+MARKER_PATTERN = re.compile(r'<!-- mr-analyzer:([0-9a-f]{16}) -->')
+
+
+def finding_marker(*parts: str) -> str:
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+SUMMARY_MARKER = finding_marker('summary')
+
+
+def marked(text: str, marker: str) -> str:
+    return f"{text}\n\n<!-- mr-analyzer:{marker} -->"
+
+
+def posted_markers(bodies: List[str]) -> Set[str]:
+    """
+    Collect the markers of the comments earlier runs posted.
+    """
+    markers = set()
+    for body in bodies:
+        markers.update(MARKER_PATTERN.findall(body or ''))
+    return markers
+
+
+def first_added_line(diff: str) -> Optional[int]:
+    """
+    Return the new-file line number of the first added line of a unified diff, or None when it adds no lines.
+    """
+    line_number = 0
+    for line in diff.splitlines():
+        match = HUNK_HEADER.match(line)
+        if match:
+            line_number = int(match.group(1))
+        elif line.startswith('+') and not line.startswith('+++ '):
+            return line_number
+        elif not line.startswith(('-', '\\')):
+            line_number += 1
+    return None
+
+
+def review_comments(file_path: str, changes: ChangeSet, test_review: TestFileReview, code_review: CodeReview) -> List[ReviewComment]:
+    """
+    Turn a file's MUST and SHOULD findings into comments anchored to its first added line.
+    Reviews are per file, so that is the closest line the findings can be placed on.
+    """
+    findings = []
+    scenarios = test_review.are_there_missing_test_scenarios
+    if test_review.is_test_file:
+        findings.append(("Review of Test", scenarios))
+    findings.extend((label, getattr(code_review, name)) for name, label in COMMENT_LABELS.items())
+
+    change = changes.get(file_path)
+    line = first_added_line(change.diff) if change else None
+    comments = []
+    for label, comment in findings:
+        if not comment or not comment.comment or comment.severity.upper() not in PUBLISHED_SEVERITIES:
+            continue
+        # the wording of a finding changes from run to run, so it is recognized by where it is and how severe it is
+        marker = finding_marker(file_path, label, comment.severity.upper())
+        comments.append(ReviewComment(
+            file_path=file_path,
+            old_path=change.old_path if change else file_path,
+            line=line,
+            body=marked(f"**[{comment.severity}] {label}**: {comment.comment}", marker),
+            marker=marker,
+        ))
+    return comments
+
+
+def summary_note(final_score: float, must_count: int, missing_tests: bool, unanchored: List[ReviewComment]) -> str:
+    """
+    Write the note posted with the inline comments, listing the findings that have no line to be anchored to.
+    """
+    lines = [f"**Merge request review**: final score {final_score:.1f}/10, {must_count} MUST findings."]
+    if missing_tests:
+        lines.append("CRITICAL: No test files detected.")
+    for comment in unanchored:
+        lines.append(f"- `{comment.file_path}`: {MARKER_PATTERN.sub('', comment.body).strip()}")
+    return marked('\n'.join(lines), SUMMARY_MARKER)
+
+
+def publish_review(vcs, vcs_client, comments: List[ReviewComment], final_score: float, must_count: int, missing_tests: bool) -> int:
+    """
+    Post the findings not already on the merge request as one review: inline comments plus a summary note.
+    Returns the number of inline comments posted; nothing is sent when there are no new findings and a summary was
+    posted by an earlier run.
+    """
+    project_path = vcs.project_path()
+    change_id = vcs.change_id()
+    posted = posted_markers(vcs.posted_comments(vcs_client, project_path, change_id))
+    new_comments = []
+    for comment in comments:
+        if comment.marker not in posted:
+            posted.add(comment.marker)
+            new_comments.append(comment)
+    inline = [comment for comment in new_comments if comment.line is not None]
+    note = summary_note(final_score, must_count, missing_tests, [comment for comment in new_comments if comment.line is None])
+    # a later summary is only posted along with new findings
+    if not new_comments and SUMMARY_MARKER in posted:
+        return 0
+    vcs.post_review(vcs_client, project_path, change_id, inline, note)
+    return len(inline)
@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+from typing import Dict, Optional
+from diff_chunker import estimate_tokens
+from llm.llm_backend import LARGE_MODEL, SMALL_MODEL
+from test_classifier import classify_test_file
+from vcs.change_set import count_diff_lines
+
+# reviewed by local_lint without a model call
+LINT = 'lint'
+
+# paths where a small change can still be a vulnerability or an outage
+RISKY_PATH_PATTERN = re.compile(
+    r'(auth|security|crypto|secret|password|credential|token|session|login|permission|acl|oauth|saml|iam'
+    r'|payment|billing|migration|schema|sql|sanitiz|firewall|policy)',
+    re.IGNORECASE,
+)
+
+# changed lines that touch secrets, injection sinks, unsafe deserialization or memory-unsafe calls
+RISKY_CONTENT_PATTERN = re.compile(
+    r'(password|passwd|secret|api[_-]?key|private[_-]?key|token|\beval\(|\bexec\(|subprocess|os\.system|shell=True'
+    r'|innerHTML|dangerouslySetInnerHTML|\b(SELECT|INSERT|UPDATE|DELETE)\b.*\b(FROM|INTO|SET|WHERE)\b|pickle\.loads'
+    r'|yaml\.load\(|\bmd5\b|\bsha1\b|\bunsafe\b|strcpy|sprintf|memcpy|verify=False|chmod)',
+    re.IGNORECASE,
+)
+
+# languages and infrastructure code where review misses are most costly
+RISKY_LANGUAGES = {'C', 'C++', 'PHP', 'Shell', 'PowerShell', 'SQL', 'Terraform', 'Docker'}
+
+# rough USD per million prompt tokens of each tier, for the savings estimate against reviewing everything on the large model
+TIER_PRICES = {LINT: 0.0, SMALL_MODEL: 0.15, LARGE_MODEL: 2.50}
+
+
+def changed_lines(diff: str) -> str:
+    return '\n'.join(line for line in diff.splitlines() if line.startswith(('+', '-')) and not line.startswith(('+++ ', '--- ')))
+
+
+class RoutingStats:
+    """
+    Counts the files routed to each tier and their prompt tokens, to report the routing decisions and estimated savings.
+    """
+    def __init__(self):
+        self.files: Dict[str, int] = {LINT: 0, SMALL_MODEL: 0, LARGE_MODEL: 0}
+        self.tokens: Dict[str, int] = {LINT: 0, SMALL_MODEL: 0, LARGE_MODEL: 0}
+        self.lock = threading.Lock()
+
+    def record(self, tier: str, tokens: int) -> None:
+        with self.lock:
+            self.files[tier] += 1
+            self.tokens[tier] += tokens
+
+    def savings(self) -> float:
+        return sum(tokens * (TIER_PRICES[LARGE_MODEL] - TIER_PRICES[tier]) for tier, tokens in self.tokens.items()) / 1_000_000
+
+    def summary(self) -> str:
+        return (
+            f"Model routing: {self.files[LINT]} files linted locally, {self.files[SMALL_MODEL]} on the small model, "
+            f"{self.files[LARGE_MODEL]} on the large model (~${self.savings():.4f} saved against the large model only)"
+        )
+
+
+class ReviewRouter:
+    """
+    Scores a change by size, language, path and the risk of its changed lines, and picks how it is reviewed: trivial
+    changes by the local lint pass, low-risk changes by the small model, and everything else by the large model.
+    """
+    def __init__(self, lint_lines: int = 3, large_score: int = 4):
+        self.lint_lines = lint_lines
+        self.large_score = large_score
+        self.stats = RoutingStats()
+
+    @classmethod
+    def from_env(cls) -> Optional['ReviewRouter']:
+        """
+        Configure routing from REVIEW_ROUTING_LINT_LINES and REVIEW_ROUTING_LARGE_SCORE. Returns None when REVIEW_ROUTING is off.
+        """
+        if os.environ.get('REVIEW_ROUTING', 'on').lower() in ('off', '0', 'false'):
+            return None
+        return cls(int(os.environ.get('REVIEW_ROUTING_LINT_LINES', '3')), int(os.environ.get('REVIEW_ROUTING_LARGE_SCORE', '4')))
+
+    def score(self, file_path: str, language: str, contents: str) -> int:
+        """
+        Score the risk of a change: points for size, risky paths, risky languages and risky changed lines.
+        """
+        additions, deletions = count_diff_lines(contents)
+        size = additions + deletions
+        # size alone sends diffs over 400 changed lines to the large model
+        score = 0 if size <= 20 else 1 if size <= 100 else 2 if size <= 400 else 4
+        if RISKY_PATH_PATTERN.search(file_path):
+            score += 3
+        if language in RISKY_LANGUAGES:
+            score += 2
+        if RISKY_CONTENT_PATTERN.search(changed_lines(contents)):
+            score += 3
+        # test code only breaks the build, not production
+        if classify_test_file(file_path, language, contents):
+            score -= 1
+        return score
+
+    def route(self, file_path: str, language: str, contents: str) -> str:
+        """
+        Return the tier a file's diff is reviewed with and record the decision.
+        """
+        additions, deletions = count_diff_lines(contents)
+        score = self.score(file_path, language, contents)
+        if additions + deletions <= self.lint_lines and score <= 0:
+            tier = LINT
+        elif score >= self.large_score:
+            tier = LARGE_MODEL
+        else:
+            tier = SMALL_MODEL
+        self.stats.record(tier, estimate_tokens(contents))
+        return tier
@@ -0,0 +1,225 @@
+"""
+Run the analyzer as a resident service that reviews merge requests from webhook events.
+
+    REVIEW_WEBHOOK_SECRET=... python review_service.py
+
+POST GitLab merge request hooks, GitHub pull_request events or {"url": ..., "head_sha": ...} to /events.
+GET /health reports the job queue counts.
+"""
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+from batch_analyzer import ClientPool, review_merge_request
+from gitlab_mr_analyzer import console_stream, create_review_context, error_message, publish_result, render_review, save_review_state
+from job_queue import DEFAULT_QUEUE_PATH, JobQueue, QueueFullError
+from review_pipeline import ReviewContext
+
+# webhook bodies larger than this are rejected without being read
+MAX_EVENT_BYTES = 5 * 1024 * 1024
+
+# hosts merge requests are reviewed on unless REVIEW_ALLOWED_HOSTS says otherwise
+DEFAULT_ALLOWED_HOSTS = 'gitlab.com,github.com'
+
+
+def parse_event(headers, payload: dict) -> Optional[Tuple[str, str]]:
+    """
+    Extract (mr_url, head_sha) from a webhook event, or None for events that do not need a review.
+    """
+    if headers.get('X-Gitlab-Event') == 'Merge Request Hook':
+        attributes = payload.get('object_attributes', {})
+        # updates without oldrev changed the title or labels, not the code
+        if attributes.get('action') not in ('open', 'reopen', 'update') or (attributes.get('action') == 'update' and 'oldrev' not in attributes):
+            return None
+        return attributes['url'], attributes.get('last_commit', {}).get('id', '')
+    if headers.get('X-GitHub-Event') == 'pull_request':
+        if payload.get('action') not in ('opened', 'reopened', 'synchronize'):
+            return None
+        pull_request = payload['pull_request']
+        return pull_request['html_url'], pull_request['head']['sha']
+    if 'url' in payload:
+        return payload['url'], payload.get('head_sha', '')
+    return None
+
+
+def is_allowed_url(mr_url: str, allowed_hosts: Set[str]) -> bool:
+    """
+    Check that an event's merge request URL is on a configured VCS host, since reviewing it sends that host the VCS token.
+    """
+    parsed = urlparse(mr_url)
+    return parsed.scheme in ('http', 'https') and (parsed.hostname or '').lower() in allowed_hosts
+
+
+def is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def is_authorized(headers, body: bytes, secret: str) -> bool:
+    """
+    Check the event against the shared secret using GitLab's token header, GitHub's HMAC signature or X-Review-Token.
+    """
+    if not secret:
+        return True
+    gitlab_token = headers.get('X-Gitlab-Token') or headers.get('X-Review-Token')
+    if gitlab_token:
+        return hmac.compare_digest(gitlab_token, secret)
+    signature = headers.get('X-Hub-Signature-256')
+    if signature:
+        expected = 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(signature, expected)
+    return False
+
+
+class ReviewServiceHandler(BaseHTTPRequestHandler):
+    server: 'ReviewServer'
+
+    def send_json(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        encoded = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self) -> None:
+        if self.path != '/health':
+            self.send_json(404, {'error': 'not found'})
+            return
+        self.send_json(200, {'jobs': self.server.queue.counts()})
+
+    def do_POST(self) -> None:
+        if self.path != '/events':
+            self.send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', '0'))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_json(400, {'error': 'invalid Content-Length'})
+            return
+        if length > MAX_EVENT_BYTES:
+            self.send_json(413, {'error': 'event too large'})
+            return
+        body = self.rfile.read(length)
+        if not is_authorized(self.headers, body, self.server.secret):
+            self.send_json(401, {'error': 'invalid webhook secret'})
+            return
+        try:
+            event = parse_event(self.headers, json.loads(body or b'{}'))
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {'error': f'invalid event: {e}'})
+            return
+        if event is None:
+            self.send_json(202, {'status': 'ignored'})
+            return
+        if not is_allowed_url(event[0], self.server.allowed_hosts):
+            self.send_json(403, {'error': 'merge request URL is not on an allowed host'})
+            return
+        try:
+            status = self.server.queue.enqueue(*event)
+        except QueueFullError as e:
+            # backpressure: the sender should retry once the workers have caught up
+            self.send_json(503, {'error': str(e)}, {'Retry-After': '30'})
+            return
+        self.send_json(202, {'status': status})
+
+
+class ReviewServer(ThreadingHTTPServer):
+    """
+    HTTP endpoint and worker pool sharing one review context and VCS client pool for its lifetime.
+    """
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], queue: JobQueue, context: ReviewContext, workers: int, secret: str, allowed_hosts: Set[str]):
+        super().__init__(address, ReviewServiceHandler)
+        self.queue = queue
+        self.context = context
+        self.secret = secret
+        self.allowed_hosts = allowed_hosts
+        self.pool = ClientPool()
+        self.print_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.workers = [threading.Thread(target=self.work, name=f'review-worker-{i}', daemon=True) for i in range(workers)]
+
+    def start_workers(self) -> None:
+        for worker in self.workers:
+            worker.start()
+
+    def work(self) -> None:
+        """
+        Review queued merge requests one at a time until the server stops.
+        """
+        while not self.stopping.is_set():
+            job = self.queue.claim(timeout=1.0)
+            if job is None:
+                continue
+            job_id, mr_url, head_sha = job
+            try:
+                review = review_merge_request(self.context, self.pool, mr_url)
+                with self.print_lock:
+                    result = render_review(self.context, review)
+                save_review_state(self.context, review)
+                publish_result(self.context, review, result)
+                self.queue.complete(job_id, f"{result.failed} file reviews failed" if result.failed else '')
+            except Exception as e:
+                with self.print_lock:
+                    print(f"{mr_url}: {error_message(e)}", file=console_stream())
+                self.queue.complete(job_id, error_message(e))
+
+    def stop(self) -> None:
+        self.stopping.set()
+        self.shutdown()
+        for worker in self.workers:
+            worker.join()
+
+
+def main() -> None:
+    address = (os.environ.get('REVIEW_SERVICE_HOST', '127.0.0.1'), int(os.environ.get('REVIEW_SERVICE_PORT', '8080')))
+    secret = os.environ.get('REVIEW_WEBHOOK_SECRET', '')
+    # without a secret anyone who can reach the port could queue reviews, so only local clients may
+    if not secret and not is_loopback(address[0]):
+        print(f"Error: REVIEW_WEBHOOK_SECRET must be set to listen on {address[0]}", file=sys.stderr)
+        sys.exit(1)
+    allowed_hosts = {host.strip().lower() for host in os.environ.get('REVIEW_ALLOWED_HOSTS', DEFAULT_ALLOWED_HOSTS).split(',') if host.strip()}
+    queue = JobQueue(
+        os.environ.get('REVIEW_QUEUE_PATH', DEFAULT_QUEUE_PATH),
+        int(os.environ.get('REVIEW_QUEUE_MAX_PENDING', '100')),
+        float(os.environ.get('REVIEW_QUEUE_RETENTION_DAYS', '7')),
+    )
+    try:
+        context = create_review_context(resident=True)
+    except ValueError as e:
+        queue.close()
+        print(error_message(e), file=sys.stderr)
+        sys.exit(1)
+    server = ReviewServer(address, queue, context, int(os.environ.get('REVIEW_WORKERS', '2')), secret, allowed_hosts)
+    server.start_workers()
+    print(f"Review service listening on http://{address[0]}:{address[1]}", file=console_stream())
+    serve = threading.Thread(target=server.serve_forever, name='review-http')
+    serve.start()
+    try:
+        serve.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        context.close()
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
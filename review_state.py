@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from models.code_review import CodeReview
+from models.test_file_review import TestFileReview
+
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'mr-analyzer', 'state.sqlite3')
+
+# bumped when the tables change; older stores are dropped and start over
+SCHEMA_VERSION = 2
+
+# the hunk keys of a diff and the review that covered exactly those hunks
+ReviewPart = Tuple[List[str], CodeReview]
+
+# the identity a file was reviewed with, its test review and the parts of its code review
+StoredReview = Tuple[str, TestFileReview, List[ReviewPart]]
+
+
+class ReviewState:
+    """
+    Remembers the per-file reviews of each merge request, split into the parts that covered its hunks, plus the file
+    reviews checkpointed by a run still in progress so a failed run can resume where it stopped. Reviews are stored with
+    the identity of the models, prompts and coding standards that produced them and only returned to runs that match it.
+    """
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.connection.executescript(f"""
+                DROP TABLE IF EXISTS merge_requests;
+                DROP TABLE IF EXISTS file_reviews;
+                DROP TABLE IF EXISTS checkpoints;
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS file_reviews (
+                review_key TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                identity TEXT NOT NULL,
+                test_review TEXT NOT NULL,
+                parts TEXT NOT NULL,
+                PRIMARY KEY (review_key, file_path)
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                review_key TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                head_sha TEXT NOT NULL,
+                identity TEXT NOT NULL,
+                test_review TEXT NOT NULL,
+                code_review TEXT NOT NULL,
+                PRIMARY KEY (review_key, file_path)
+            );
+        """)
+        self.connection.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional['ReviewState']:
+        """
+        Open the state store at REVIEW_STATE_PATH. Returns None when REVIEW_INCREMENTAL is set to off.
+        """
+        if os.environ.get('REVIEW_INCREMENTAL', 'on').lower() in ('off', '0', 'false'):
+            return None
+        return cls(os.environ.get('REVIEW_STATE_PATH', DEFAULT_STATE_PATH))
+
+    def file_reviews(self, review_key: str) -> Dict[str, StoredReview]:
+        """
+        Return the stored reviews of a merge request, keyed by file.
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT file_path, identity, test_review, parts FROM file_reviews WHERE review_key = ?", (review_key,)).fetchall()
+        return {
+            file_path: (identity, TestFileReview.model_validate_json(test_review), [(keys, CodeReview.model_validate(review)) for keys, review in json.loads(parts)])
+            for file_path, identity, test_review, parts in rows
+        }
+
+    def checkpoint(self, review_key: str, head_sha: str, identity: str, file_path: str, review: Tuple[TestFileReview, CodeReview]) -> None:
+        """
+        Store a file review as soon as it completes, before the run that reviews head_sha has finished.
+        """
+        test_review, code_review = review
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (review_key, file_path, head_sha, identity, test_review, code_review) VALUES (?, ?, ?, ?, ?, ?)",
+                (review_key, file_path, head_sha, identity, test_review.model_dump_json(), code_review.model_dump_json()),
+            )
+            self.connection.commit()
+
+    def checkpoints(self, review_key: str, head_sha: str, identities: Dict[str, str]) -> Dict[str, Tuple[TestFileReview, CodeReview]]:
+        """
+        Return the file reviews checkpointed by an unfinished run at head_sha with the identity each file is reviewed with now.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT file_path, identity, test_review, code_review FROM checkpoints WHERE review_key = ? AND head_sha = ?", (review_key, head_sha)
+            ).fetchall()
+        return {
+            file_path: (TestFileReview.model_validate_json(test_review), CodeReview.model_validate_json(code_review))
+            for file_path, identity, test_review, code_review in rows if identities.get(file_path) == identity
+        }
+
+    def save(self, review_key: str, reviews: Dict[str, StoredReview]) -> None:
+        """
+        Replace the stored reviews of a merge request with those of a finished run, and drop its checkpoints.
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM file_reviews WHERE review_key = ?", (review_key,))
+            self.connection.execute("DELETE FROM checkpoints WHERE review_key = ?", (review_key,))
+            self.connection.executemany(
+                "INSERT INTO file_reviews (review_key, file_path, identity, test_review, parts) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (review_key, file_path, identity, test_review.model_dump_json(), json.dumps([(keys, review.model_dump()) for keys, review in parts]))
+                    for file_path, (identity, test_review, parts) in reviews.items()
+                ],
+            )
+            self.connection.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from diff_chunker import estimate_tokens
+
+STANDARDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standards', 'coding')
+
+# standards every language is reviewed against, ahead of the language's own
+COMMON_STANDARDS = 'common'
+
+
+def load_standards(directory: str) -> Dict[str, str]:
+    """
+    Read every <name>.txt in a directory, keyed by lowercased name.
+    """
+    standards = {}
+    for file_name in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(file_name)
+        if extension == '.txt':
+            with open(os.path.join(directory, file_name), 'r') as file:
+                standards[name.lower()] = file.read()
+    return standards
+
+
+class CodingStandards:
+    """
+    The common and language standards a file is reviewed against, hashed once for cache keys and sized for prompt budgets.
+    The text is identical for every file of a language in a project, so prompts that start with it share a cacheable prefix.
+    """
+    def __init__(self, language: str, text: str):
+        self.language = language
+        self.text = text
+        self.sha = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        self.tokens = estimate_tokens(text)
+
+
+class StandardsRegistry:
+    """
+    All coding standards, loaded once. An overrides directory holds per-project standards in <project_path>/<name>.txt,
+    e.g. overrides/group/project/go.txt, which replace the file of the same name for that project only.
+    """
+    def __init__(self, standards_dir: str = STANDARDS_DIR, overrides_dir: Optional[str] = None):
+        self.base = load_standards(standards_dir)
+        self.overrides: Dict[str, Dict[str, str]] = {}
+        if overrides_dir:
+            for directory, _, file_names in os.walk(overrides_dir):
+                if any(file_name.endswith('.txt') for file_name in file_names):
+                    project_path = os.path.relpath(directory, overrides_dir).replace(os.sep, '/')
+                    self.overrides[project_path] = load_standards(directory)
+        self.standards: Dict[Tuple[str, str], Optional[CodingStandards]] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'StandardsRegistry':
+        return cls(os.environ.get('REVIEW_STANDARDS_DIR', STANDARDS_DIR), os.environ.get('REVIEW_STANDARDS_OVERRIDES_DIR'))
+
+    def text(self, name: str, project_path: str) -> Optional[str]:
+        overrides = self.overrides.get(project_path.strip('/'), {})
+        return overrides.get(name, self.base.get(name))
+
+    def get(self, language: str, project_path: str = '') -> Optional[CodingStandards]:
+        """
+        Return the standards for a language in a project, or None when the language has none.
+        """
+        key = (project_path, language.lower())
+        with self.lock:
+            if key not in self.standards:
+                language_text = self.text(key[1], project_path)
+                if language_text is None:
+                    self.standards[key] = None
+                else:
+                    self.standards[key] = CodingStandards(language, (self.text(COMMON_STANDARDS, project_path) or '') + language_text)
+            return self.standards[key]
@@ -0,0 +1,78 @@
+import re
+import threading
+from typing import Dict, Optional
+
+# file names and directories that are tests by convention
+TEST_PATH_PATTERN = re.compile(
+    r'(^|/)(__tests__|tests?|spec)/'
+    r'|(^|/)test_[^/]*\.py$'
+    r'|_test\.(go|py|rs|exs?|cpp|cc|c)$'
+    r'|\.(test|spec)\.(js|jsx|ts|tsx|mjs|cjs)$'
+    r'|_spec\.rb$'
+    r'|(^|/)[^/]*Tests?\.(java|kt|cs|swift|scala)$'
+    r'|(^|/)Test[A-Z][^/]*\.(java|kt|cs)$'
+)
+
+# imports and markers that only appear in test code
+TEST_CONTENT_PATTERN = re.compile(
+    r'^[+ ]\s*(import pytest|from pytest|import unittest|from unittest|import org\.junit|import static org\.junit'
+    r'|import "testing"|"testing"$|using Xunit|using NUnit|using Microsoft\.VisualStudio\.TestTools'
+    r'|\[TestMethod\]|\[Fact\]|\[Test\]|#\[test\]|#\[cfg\(test\)\]|RSpec\.describe|require .spec_helper.'
+    r'|import XCTest|describe\(|func Test[A-Z_])',
+    re.MULTILINE,
+)
+
+# weaker hints that a file may be test related; their presence without a strong signal defers to the LLM
+TEST_HINT_PATTERN = re.compile(r'(?<![a-z])(test|spec|mock|fixture|assert)', re.IGNORECASE)
+
+# languages whose toolchain only treats files following the naming convention as tests
+STRICT_NAMING_LANGUAGES = {'Go', 'Rust'}
+
+
+def classify_test_file(file_path: str, language: str, contents: str) -> Optional[bool]:
+    """
+    Decide from path conventions and the diff contents whether a file is a test.
+    Returns None when the signals are ambiguous and the LLM should decide.
+    """
+    if TEST_PATH_PATTERN.search(file_path):
+        return True
+    if TEST_CONTENT_PATTERN.search(contents):
+        return True
+    if language in STRICT_NAMING_LANGUAGES:
+        return False
+    if TEST_HINT_PATTERN.search(file_path) or TEST_HINT_PATTERN.search(contents):
+        return None
+    return False
+
+
+class ClassifierStats:
+    """
+    Counts the pre-classifier's decisions so its hit rate and the is_test_file calls it saved can be reported.
+    """
+    def __init__(self):
+        self.decisions: Dict[str, int] = {'test': 0, 'not_test': 0, 'ambiguous': 0}
+        # ambiguous files whose trivial change is linted locally and so never asked about
+        self.lint_skipped = 0
+        self.lock = threading.Lock()
+
+    def record(self, decision: Optional[bool]) -> None:
+        key = 'ambiguous' if decision is None else 'test' if decision else 'not_test'
+        with self.lock:
+            self.decisions[key] += 1
+
+    def record_lint_skip(self) -> None:
+        with self.lock:
+            self.lint_skipped += 1
+
+    def total(self) -> int:
+        return sum(self.decisions.values())
+
+    def hit_rate(self) -> float:
+        total = self.total()
+        return (total - self.decisions['ambiguous']) / total if total else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Test classifier: {self.total() - self.decisions['ambiguous']}/{self.total()} files decided locally "
+            f"({self.hit_rate():.0%} hit rate), {self.decisions['not_test'] + self.lint_skipped} is_test_file LLM calls saved"
+        )
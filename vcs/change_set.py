@@ -0,0 +1,48 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from models.change import Change
+
+
+def count_diff_lines(diff: str) -> Tuple[int, int]:
+    """
+    Count the added and deleted lines in a unified diff. Lines before the first hunk are the file header, if any;
+    inside hunks a deleted "-- comment" or an added "++ x" line counts like any other.
+    """
+    additions = 0
+    deletions = 0
+    in_hunk = False
+    for line in diff.splitlines():
+        if line.startswith('@@'):
+            in_hunk = True
+        elif not in_hunk:
+            continue
+        elif line.startswith('+'):
+            additions += 1
+        elif line.startswith('-'):
+            deletions += 1
+    return additions, deletions
+
+
+class ChangeSet:
+    """
+    The files changed by a merge request or pull request, fetched once and indexed by new path.
+    """
+    def __init__(self, changes: List[Change]):
+        self.changes: Dict[str, Change] = {change.new_path: change for change in changes}
+
+    def __iter__(self) -> Iterator[Change]:
+        return iter(self.changes.values())
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.changes
+
+    def __getitem__(self, path: str) -> Change:
+        return self.changes[path]
+
+    def get(self, path: str) -> Optional[Change]:
+        return self.changes.get(path)
+
+    def paths(self) -> List[str]:
+        return list(self.changes)
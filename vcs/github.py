@@ -1,12 +1,21 @@
 from urllib.parse import urlparse
 from vcs.version_control import VersionControl
 from github import Github
-from typing import List, Dict
+from typing import List, Optional
+from models.change import Change
+from models.review_comment import ReviewComment
+from vcs.change_set import ChangeSet
+
+# GitHub file statuses mapped onto Change.status; copied, changed and unchanged files count as modified
+GITHUB_STATUSES = {'added': 'added', 'removed': 'deleted', 'renamed': 'renamed'}
 
 
 class GitHub(VersionControl):
     def __init__(self, mr_url: str):
         self.mr_url = mr_url
+        self.changes: Optional[ChangeSet] = None
+        self.repo = None
+        self.pull_request = None
 
     def domain(self) -> str:
         """
@@ -45,18 +54,53 @@ class GitHub(VersionControl):
         """
         return Github(token)
 
-    def checkout_changes(self, vcs_client: Github, project_path: str, pr_number: str) -> List[Dict]:
+    def pull(self, vcs_client: Github, project_path: str, pr_number: str):
+        if self.pull_request is None:
+            self.repo = vcs_client.get_repo(project_path)
+            self.pull_request = self.repo.get_pull(int(pr_number))
+        return self.pull_request
+
+    def checkout_changes(self, vcs_client: Github, project_path: str, pr_number: str) -> ChangeSet:
         """
-        Fetch the changes for a given pull request.
+        Fetch the changes for a given pull request. The paginated file list is only fetched once.
         """
-        repo = vcs_client.get_repo(project_path)
-        pull_request = repo.get_pull(int(pr_number))
-        
-        changes = []
-        for file in pull_request.get_files():
-            changes.append({
-                'new_path': file.filename,
-                'diff': file.patch
-            })
-        
-        return changes
+        if self.changes is not None:
+            return self.changes
+
+        pull_request = self.pull(vcs_client, project_path, pr_number)
+        self.changes = ChangeSet([to_change(file) for file in pull_request.get_files()])
+        return self.changes
+
+    def head_sha(self, vcs_client: Github, project_path: str, pr_number: str) -> str:
+        return self.pull(vcs_client, project_path, pr_number).head.sha
+
+    def posted_comments(self, vcs_client: Github, project_path: str, pr_number: str) -> List[str]:
+        pull_request = self.pull(vcs_client, project_path, pr_number)
+        bodies = [comment.body for comment in pull_request.get_review_comments()]
+        bodies.extend(review.body for review in pull_request.get_reviews())
+        return bodies
+
+    def post_review(self, vcs_client: Github, project_path: str, pr_number: str, comments: List[ReviewComment], body: str) -> None:
+        """
+        Submit one review holding the summary and every inline comment, so the pull request gets a single notification.
+        """
+        pull_request = self.pull(vcs_client, project_path, pr_number)
+        pull_request.create_review(
+            body=body,
+            event='COMMENT',
+            comments=[{'path': comment.file_path, 'line': comment.line, 'side': 'RIGHT', 'body': comment.body} for comment in comments],
+        )
+
+
+def to_change(file) -> Change:
+    """
+    Convert a GitHub pull request or comparison file into a Change.
+    """
+    return Change(
+        new_path=file.filename,
+        old_path=file.previous_filename or file.filename,
+        diff=file.patch or '',
+        status=GITHUB_STATUSES.get(file.status, 'modified'),
+        additions=file.additions,
+        deletions=file.deletions,
+    )
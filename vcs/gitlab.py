@@ -1,6 +1,9 @@
 import gitlab
 from urllib.parse import urlparse
-from typing import List
+from typing import List, Optional
+from models.change import Change
+from models.review_comment import ReviewComment
+from vcs.change_set import ChangeSet, count_diff_lines
 from vcs.version_control import VersionControl
 
 class GitLab(VersionControl):
@@ -10,7 +13,9 @@ class GitLab(VersionControl):
         self.path_parts = "" 
         self.project_url_path = ""
         self.request_id = ""
-        self.changes = []
+        self.changes: Optional[ChangeSet] = None
+        self.project = None
+        self.mr = None
 
     def domain(self) -> str:
         """
@@ -50,12 +55,81 @@ class GitLab(VersionControl):
         gitlab_url = f"https://{url}"
         return gitlab.Gitlab(gitlab_url, private_token=token)
     
-    def checkout_changes(self, vcs_client: gitlab.Gitlab, project_path: str, mr_iid: int) -> List[str]:
-        if self.changes != []:
+    def merge_request(self, vcs_client: gitlab.Gitlab, project_path: str, mr_iid: int):
+        if self.mr is None:
+            self.project = vcs_client.projects.get(project_path)
+            self.mr = self.project.mergerequests.get(mr_iid)
+        return self.mr
+
+    def checkout_changes(self, vcs_client: gitlab.Gitlab, project_path: str, mr_iid: int) -> ChangeSet:
+        if self.changes is not None:
             return self.changes
         
-        project = vcs_client.projects.get(project_path)
-        mr = project.mergerequests.get(mr_iid)
+        mr = self.merge_request(vcs_client, project_path, mr_iid)
         
-        self.changes = mr.changes()['changes']
-        return self.changes
\ No newline at end of file
+        self.changes = ChangeSet([to_change(change) for change in mr.changes()['changes']])
+        return self.changes
+
+    def head_sha(self, vcs_client: gitlab.Gitlab, project_path: str, mr_iid: int) -> str:
+        return self.merge_request(vcs_client, project_path, mr_iid).sha
+
+    def posted_comments(self, vcs_client: gitlab.Gitlab, project_path: str, mr_iid: int) -> List[str]:
+        mr = self.merge_request(vcs_client, project_path, mr_iid)
+        return [note.body for note in mr.notes.list(iterator=True)]
+
+    def post_review(self, vcs_client: gitlab.Gitlab, project_path: str, mr_iid: int, comments: List[ReviewComment], body: str) -> None:
+        """
+        Add every comment and the summary as draft notes and publish them together, so the merge request gets a single
+        notification. python-gitlab has no draft notes manager yet, so the REST endpoints are called directly.
+        """
+        mr = self.merge_request(vcs_client, project_path, mr_iid)
+        draft_notes = f"/projects/{self.project.id}/merge_requests/{mr.iid}/draft_notes"
+        diff_refs = mr.diff_refs
+        created = []
+        try:
+            for comment in comments:
+                created.append(vcs_client.http_post(draft_notes, post_data={
+                    'note': comment.body,
+                    'position': {
+                        'position_type': 'text',
+                        'base_sha': diff_refs['base_sha'],
+                        'start_sha': diff_refs['start_sha'],
+                        'head_sha': diff_refs['head_sha'],
+                        'old_path': comment.old_path,
+                        'new_path': comment.file_path,
+                        'new_line': comment.line,
+                    },
+                })['id'])
+            created.append(vcs_client.http_post(draft_notes, post_data={'note': body})['id'])
+            vcs_client.http_post(f"{draft_notes}/bulk_publish")
+        except Exception:
+            # drafts left behind would be published with the next review anyone submits on the merge request
+            for draft_id in created:
+                try:
+                    vcs_client.http_delete(f"{draft_notes}/{draft_id}")
+                except Exception:
+                    pass
+            raise
+
+def to_change(change: dict) -> Change:
+    """
+    Convert a GitLab merge request change record into a Change.
+    """
+    diff = change.get('diff') or ''
+    additions, deletions = count_diff_lines(diff)
+    if change.get('new_file'):
+        status = 'added'
+    elif change.get('deleted_file'):
+        status = 'deleted'
+    elif change.get('renamed_file'):
+        status = 'renamed'
+    else:
+        status = 'modified'
+    return Change(
+        new_path=change['new_path'],
+        old_path=change.get('old_path') or change['new_path'],
+        diff=diff,
+        status=status,
+        additions=additions,
+        deletions=deletions,
+    )
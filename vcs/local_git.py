@@ -0,0 +1,141 @@
+import os
+import subprocess
+import tempfile
+from typing import Iterable, Iterator, List, Optional
+from models.change import Change
+from models.review_comment import ReviewComment
+from vcs.change_set import ChangeSet
+from vcs.version_control import VersionControl
+
+
+class LocalGit(VersionControl):
+    """
+    Reads changes straight from a local repository for a base..head range. Needs no network access or token.
+    """
+    def __init__(self, revision_range: str, repo_dir: str = '.'):
+        self.revision_range = revision_range
+        self.repo_dir = repo_dir
+        self.changes: Optional[ChangeSet] = None
+
+    def domain(self) -> str:
+        return 'local'
+
+    def project_path(self) -> str:
+        return os.path.abspath(self.repo_dir)
+
+    def change_id(self) -> str:
+        """
+        Return the range as base...head. Like a merge request, it compares head against its merge base with base.
+        """
+        base, separator, head = self.revision_range.partition('...')
+        if not separator:
+            base, separator, head = self.revision_range.partition('..')
+        if not separator or not base:
+            raise ValueError("Invalid git range, expected <base>..<head>")
+        return f"{base}...{head or 'HEAD'}"
+
+    def client(self, url: str, token: str) -> str:
+        """
+        There is no API client for a local repository; the repository directory stands in for it.
+        """
+        return self.project_path()
+
+    def checkout_changes(self, vcs_client: str, project_path: str, revision_range: str) -> ChangeSet:
+        if self.changes is not None:
+            return self.changes
+
+        self.changes = git_diff(project_path, revision_range)
+        return self.changes
+
+    def head_sha(self, vcs_client: str, project_path: str, revision_range: str) -> str:
+        head = revision_range.partition('...')[2]
+        result = subprocess.run(['git', '-C', project_path, 'rev-parse', '--verify', f'{head}^{{commit}}'], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise ValueError(f"git rev-parse {head} failed: {result.stderr.strip()}")
+        return result.stdout.strip()
+
+    def posted_comments(self, vcs_client: str, project_path: str, revision_range: str) -> List[str]:
+        return []
+
+    def post_review(self, vcs_client: str, project_path: str, revision_range: str, comments: List[ReviewComment], body: str) -> None:
+        raise ValueError("A local git range has no merge request to post review comments to")
+
+
+def git_diff(project_path: str, revision_range: str) -> ChangeSet:
+    """
+    Run a single git diff for the range and parse its output as it streams in.
+    """
+    # explicit prefixes keep a user's diff.noprefix or diff.mnemonicPrefix setting from changing the paths strip_prefix expects
+    command = ['git', '-c', 'core.quotepath=false', '-C', project_path, 'diff', '--no-color', '--no-ext-diff', '--find-renames',
+               '--src-prefix=a/', '--dst-prefix=b/', revision_range, '--']
+    # stderr goes to a file so git cannot block on a full stderr pipe while stdout is still being read
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True, encoding='utf-8', errors='replace')
+        changes = list(parse_diff(process.stdout))
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise ValueError(f"git diff {revision_range} failed: {stderr.read().decode('utf-8', 'replace').strip()}")
+    return ChangeSet(changes)
+
+
+def strip_prefix(path: str) -> str:
+    """
+    Remove the a/ or b/ prefix git puts in front of diff paths.
+    """
+    return path[2:] if path.startswith(('a/', 'b/')) else path
+
+
+def header_path(line: str) -> str:
+    """
+    Return the path of a ---/+++ line without its prefix and the tab git appends to paths that contain a space.
+    """
+    return strip_prefix(line[4:].rstrip('\n').rstrip('\t'))
+
+
+def parse_diff(lines: Iterable[str]) -> Iterator[Change]:
+    """
+    Incrementally parse `git diff` output into Change records, yielding each file as soon as its diff ends.
+    Diffs start at the first hunk header, matching the diffs returned by the GitLab and GitHub APIs.
+    """
+    record: Optional[dict] = None
+    diff: List[str] = []
+    in_hunk = False
+
+    def finish() -> Change:
+        return Change(diff=''.join(diff), **record)
+
+    for line in lines:
+        if line.startswith('diff --git '):
+            if record is not None:
+                yield finish()
+            # paths from this line are only a fallback; the ---/+++ and rename lines are unambiguous
+            _, _, paths = line.rstrip('\n').partition('diff --git ')
+            old_path, _, new_path = paths.partition(' b/')
+            record = {'old_path': strip_prefix(old_path), 'new_path': new_path, 'status': 'modified', 'additions': 0, 'deletions': 0}
+            diff = []
+            in_hunk = False
+        elif record is None:
+            continue
+        elif in_hunk or line.startswith('@@'):
+            in_hunk = True
+            diff.append(line)
+            if line.startswith('+'):
+                record['additions'] += 1
+            elif line.startswith('-'):
+                record['deletions'] += 1
+        elif line.startswith('new file mode'):
+            record['status'] = 'added'
+        elif line.startswith('deleted file mode'):
+            record['status'] = 'deleted'
+        elif line.startswith('rename from '):
+            record['old_path'] = line[len('rename from '):].rstrip('\n')
+            record['status'] = 'renamed'
+        elif line.startswith('rename to '):
+            record['new_path'] = line[len('rename to '):].rstrip('\n')
+        elif line.startswith('--- ') and not line.startswith('--- /dev/null'):
+            record['old_path'] = header_path(line)
+        elif line.startswith('+++ ') and not line.startswith('+++ /dev/null'):
+            record['new_path'] = header_path(line)
+
+    if record is not None:
+        yield finish()
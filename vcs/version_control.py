@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
-import gitlab
-from typing import List
+from typing import TYPE_CHECKING, List
+from models.review_comment import ReviewComment
+from vcs.change_set import ChangeSet
+
+if TYPE_CHECKING:
+    import gitlab
 
 class VersionControl(ABC):
     @abstractmethod
@@ -24,6 +28,21 @@ class VersionControl(ABC):
         pass
     
     @abstractmethod
-    def checkout_changes(self, vcs_client: gitlab.Gitlab, project_path: str, mr_iid: int) -> List[str]:
-        """Return the changes for the merge request or pull request."""
-        pass
\ No newline at end of file
+    def checkout_changes(self, vcs_client: 'gitlab.Gitlab', project_path: str, mr_iid: int) -> ChangeSet:
+        """Return the changes for the merge request or pull request. Implementations fetch them only once."""
+        pass
+
+    @abstractmethod
+    def head_sha(self, vcs_client: 'gitlab.Gitlab', project_path: str, mr_iid: int) -> str:
+        """Return the commit SHA at the head of the merge request or pull request."""
+        pass
+
+    @abstractmethod
+    def posted_comments(self, vcs_client: 'gitlab.Gitlab', project_path: str, mr_iid: int) -> List[str]:
+        """Return the bodies of the notes and review comments already on the merge request or pull request."""
+        pass
+
+    @abstractmethod
+    def post_review(self, vcs_client: 'gitlab.Gitlab', project_path: str, mr_iid: int, comments: List[ReviewComment], body: str) -> None:
+        """Post inline comments and a summary note on the merge request or pull request as a single review."""
+        pass